@@ -1,433 +1,620 @@
+"""Пакетный отчет по успеваемости абитуриентов.
+
+Для каждого входного CSV строятся пять разделов анализа; независимые разделы
+выполняются параллельно. Результаты пишутся в каталог отчета:
+report.txt (текст), report.json и stats.csv (машиночитаемые), charts.png
+(матрица диаграмм 3x3) и rejects.csv (строки, не прошедшие проверку, с причинами).
+
+    python main.py StudentsPerformance.csv
+    python main.py data/*.csv --output-dir reports --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+
+import matplotlib
+matplotlib.use('Agg')  # Неинтерактивный бэкенд: отчет строится без дисплея
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.figure import Figure
 from scipy import stats
 
+from student_analysis_project.pipeline import SCORE_COLUMNS, load_prepared_data
+
 # Настройка стиля графиков
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-# Загрузка данных
-df = pd.read_csv('StudentsPerformance.csv')
+
+def banner(lines, title, first=False):
+    """Заголовок раздела отчета"""
+    lines.append("=" * 80 if first else "\n" + "=" * 80)
+    lines.append(title)
+    lines.append("=" * 80)
+
 
 # ============================================================================
 # 1. ВЫБОР РЫНКА И ГЕНЕРАЦИЯ ИДЕЙ ПРОДУКТОВ
 # ============================================================================
 
-print("=" * 80)
-print("1. АНАЛИЗ РЫНКА И ГЕНЕРАЦИЯ ИДЕЙ ПРОДУКТОВ")
-print("=" * 80)
-
-# Создаем общий показатель успеваемости
-df['total_score'] = df['math score'] + df['reading score'] + df['writing score']
-df['average_score'] = df['total_score'] / 3
-
-# Определяем целевую аудиторию: абитуриенты, которые хотят сдать экзамен на 60+ баллов
-df['target_group'] = df['average_score'] >= 60
-target_students = df[df['target_group']]
-
-print(f"Всего абитуриентов в датасете: {len(df)}")
-print(f"Целевая аудитория (абитуриенты с баллами 60+): {len(target_students)} ({len(target_students)/len(df)*100:.1f}%)")
-print(f"Абитуриенты с баллами ниже 60: {len(df) - len(target_students)} ({(len(df) - len(target_students))/len(df)*100:.1f}%)")
-
-# Генерация идей продуктов
-print("\n" + "=" * 80)
-print("ПРЕДЛОЖЕНИЯ ДЛЯ ПРОДУКТОВ НА РЫНКЕ ПОДГОТОВКИ К ЭКЗАМЕНАМ")
-print("=" * 80)
-
-# Предварительные вычисления для обоснований
-bachelor_degree = "bachelor's degree"
-master_degree = "master's degree"
-
-non_higher_ed_count = len(df[~df['parental level of education'].isin([bachelor_degree, master_degree])])
-non_higher_ed_percent = non_higher_ed_count / len(df) * 100
-
-free_lunch_avg = df[df['lunch'] == 'free/reduced']['average_score'].mean()
-standard_lunch_avg = df[df['lunch'] == 'standard']['average_score'].mean()
-
-group_a_avg = df[df['race/ethnicity'] == 'group A']['average_score'].mean()
-group_e_avg = df[df['race/ethnicity'] == 'group E']['average_score'].mean()
-
-ideas = [
-    {
-        "name": "Интенсивные онлайн-курсы по математике",
-        "target": "Абитуриенты со слабой математической подготовкой",
-        "rationale": f"Средний балл по математике: {df['math score'].mean():.1f}, что ниже чем по чтению ({df['reading score'].mean():.1f}) и письму ({df['writing score'].mean():.1f})"
-    },
-    {
-        "name": "Персонализированные курсы для детей из семей без высшего образования",
-        "target": "Семьи где родители имеют среднее или неполное высшее образование",
-        "rationale": f"Абитуриенты из таких семей составляют {non_higher_ed_percent:.1f}% от общего числа"
-    },
-    {
-        "name": "Программа 'Обед + Уроки'",
-        "target": "Абитуриенты с бесплатным/льготным питанием",
-        "rationale": f"Средний балл у абитуриентов с бесплатным питанием: {free_lunch_avg:.1f}, у остальных: {standard_lunch_avg:.1f}"
-    },
-    {
-        "name": "Подготовительные курсы с фокусом на письмо",
-        "target": "Абитуриенты, которым сложно дается письменная часть",
-        "rationale": f"Средний балл по письму: {df['writing score'].mean():.1f}, минимальный: {df['writing score'].min()}, максимальный: {df['writing score'].max()}"
-    },
-    {
-        "name": "Групповые занятия по этническим группам",
-        "target": "Определенные этнические группы с низкими результатами",
-        "rationale": f"Разница в средних баллах между группами: Group A: {group_a_avg:.1f}, Group E: {group_e_avg:.1f}"
+def market_section(prepared):
+    """Анализ рынка и идеи продуктов"""
+    df = prepared.df
+    lines = []
+    banner(lines, "1. АНАЛИЗ РЫНКА И ГЕНЕРАЦИЯ ИДЕЙ ПРОДУКТОВ", first=True)
+
+    # Целевая аудитория: абитуриенты, которые хотят сдать экзамен на 60+ баллов
+    target_students = int(df['target_group'].sum())
+
+    lines.append(f"Всего абитуриентов в датасете: {len(df)}")
+    lines.append(f"Целевая аудитория (абитуриенты с баллами 60+): {target_students} ({target_students/len(df)*100:.1f}%)")
+    lines.append(f"Абитуриенты с баллами ниже 60: {len(df) - target_students} ({(len(df) - target_students)/len(df)*100:.1f}%)")
+
+    # Генерация идей продуктов
+    banner(lines, "ПРЕДЛОЖЕНИЯ ДЛЯ ПРОДУКТОВ НА РЫНКЕ ПОДГОТОВКИ К ЭКЗАМЕНАМ")
+
+    # Предварительные вычисления для обоснований
+    non_higher_ed_count = int((~df['has_higher_edu_parents']).sum())
+    non_higher_ed_percent = non_higher_ed_count / len(df) * 100
+
+    free_lunch_avg = df['average_score'][df['lunch'] == 'free/reduced'].mean()
+    standard_lunch_avg = df['average_score'][df['lunch'] == 'standard'].mean()
+
+    group_a_avg = df['average_score'][df['race/ethnicity'] == 'group A'].mean()
+    group_e_avg = df['average_score'][df['race/ethnicity'] == 'group E'].mean()
+
+    ideas = [
+        {
+            "name": "Интенсивные онлайн-курсы по математике",
+            "target": "Абитуриенты со слабой математической подготовкой",
+            "rationale": f"Средний балл по математике: {df['math score'].mean():.1f}, что ниже чем по чтению ({df['reading score'].mean():.1f}) и письму ({df['writing score'].mean():.1f})"
+        },
+        {
+            "name": "Персонализированные курсы для детей из семей без высшего образования",
+            "target": "Семьи где родители имеют среднее или неполное высшее образование",
+            "rationale": f"Абитуриенты из таких семей составляют {non_higher_ed_percent:.1f}% от общего числа"
+        },
+        {
+            "name": "Программа 'Обед + Уроки'",
+            "target": "Абитуриенты с бесплатным/льготным питанием",
+            "rationale": f"Средний балл у абитуриентов с бесплатным питанием: {free_lunch_avg:.1f}, у остальных: {standard_lunch_avg:.1f}"
+        },
+        {
+            "name": "Подготовительные курсы с фокусом на письмо",
+            "target": "Абитуриенты, которым сложно дается письменная часть",
+            "rationale": f"Средний балл по письму: {df['writing score'].mean():.1f}, минимальный: {df['writing score'].min()}, максимальный: {df['writing score'].max()}"
+        },
+        {
+            "name": "Групповые занятия по этническим группам",
+            "target": "Определенные этнические группы с низкими результатами",
+            "rationale": f"Разница в средних баллах между группами: Group A: {group_a_avg:.1f}, Group E: {group_e_avg:.1f}"
+        }
+    ]
+
+    for i, idea in enumerate(ideas, 1):
+        lines.append(f"\n{i}. {idea['name']}")
+        lines.append(f"   Целевая аудитория: {idea['target']}")
+        lines.append(f"   Обоснование: {idea['rationale']}")
+
+    data = {
+        'total_students': len(df),
+        'target_students': target_students,
+        'non_higher_ed_percent': round(non_higher_ed_percent, 1),
+        'ideas': ideas
     }
-]
+    return data, lines
 
-for i, idea in enumerate(ideas, 1):
-    print(f"\n{i}. {idea['name']}")
-    print(f"   Целевая аудитория: {idea['target']}")
-    print(f"   Обоснование: {idea['rationale']}")
 
 # ============================================================================
 # 2. ОТБОР И ОЧИСТКА ДАННЫХ ДЛЯ ПРОВЕРКИ ГИПОТЕЗЫ
 # ============================================================================
 
-print("\n" + "=" * 80)
-print("2. ОТБОР И ОЧИСТКА ДАННЫХ ДЛЯ ПРОВЕРКИ ГИПОТЕЗЫ")
-print("=" * 80)
-
-# Гипотеза: посещение подготовительных курсов повышает результаты экзаменов у
-# абитуриентов из семей, где оба родителя не имеют высшего образования.
-
-# Определяем родителей без высшего образования
-higher_education = [bachelor_degree, master_degree]
-non_higher_education = ["associate's degree", "some college", "high school", "some high school"]
-
-# Отбираем нужные данные
-hypothesis_data = df.copy()
-
-# Создаем бинарные переменные
-hypothesis_data['has_higher_edu_parents'] = hypothesis_data['parental level of education'].isin(higher_education)
-hypothesis_data['took_prep_course'] = hypothesis_data['test preparation course'] == 'completed'
-hypothesis_data['is_target_group'] = hypothesis_data['average_score'] >= 60
-
-# Очистка данных (удаляем потенциальные выбросы и аномалии)
-print(f"\nРазмер данных до очистки: {len(hypothesis_data)} строк")
-
-# Проверяем на пропущенные значения
-missing_values = hypothesis_data.isnull().sum()
-print(f"\nПропущенные значения по столбцам:")
-print(missing_values[missing_values > 0])
-
-# Проверяем на аномальные значения в баллах
-for col in ['math score', 'reading score', 'writing score']:
-    q1 = hypothesis_data[col].quantile(0.01)
-    q3 = hypothesis_data[col].quantile(0.99)
-    outliers = hypothesis_data[(hypothesis_data[col] < q1) | (hypothesis_data[col] > q3)]
-    print(f"\nАномальные значения в {col}: {len(outliers)} ({len(outliers)/len(hypothesis_data)*100:.1f}%)")
-
-# Удаляем крайние выбросы (только 0 и 100 баллов как потенциально ошибочные)
-initial_count = len(hypothesis_data)
-hypothesis_data = hypothesis_data[
-    (hypothesis_data['math score'] > 0) & 
-    (hypothesis_data['math score'] < 100) &
-    (hypothesis_data['reading score'] > 0) & 
-    (hypothesis_data['reading score'] < 100) &
-    (hypothesis_data['writing score'] > 0) & 
-    (hypothesis_data['writing score'] < 100)
-]
-print(f"\nУдалено записей с крайними значениями (0 или 100): {initial_count - len(hypothesis_data)}")
-
-print(f"\nРазмер данных после очистки: {len(hypothesis_data)} строк")
-
-# Сохраняем очищенные данные для гипотезы
-cleaned_hypothesis_data = hypothesis_data[hypothesis_data['has_higher_edu_parents'] == False].copy()
-
-print(f"\nАбитуриентов из семей без высшего образования: {len(cleaned_hypothesis_data)}")
-print(f"Из них прошли подготовительные курсы: {len(cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == True])}")
-print(f"Не прошли курсы: {len(cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == False])}")
+def cleaning_section(prepared):
+    """Отбор и очистка данных для проверки гипотезы"""
+    df = prepared.df
+    lines = []
+    banner(lines, "2. ОТБОР И ОЧИСТКА ДАННЫХ ДЛЯ ПРОВЕРКИ ГИПОТЕЗЫ")
+
+    # Бинарные переменные (has_higher_edu_parents, took_prep_course, target_group)
+    # уже добавлены в базовую таблицу
+
+    # Строки с ошибками (нечисловые или вне 0-100 баллы, неизвестные категории,
+    # пропуски) отклонены при загрузке
+    validation = prepared.validation
+    lines.append(f"\nПроверено строк при загрузке: {validation.rows}, отклонено: {validation.rejected} "
+                 f"({validation.rows_per_second:.0f} строк/с)")
+    for reason, count in validation.reasons.items():
+        lines.append(f"  {reason}: {count}")
+
+    # Очистка данных (удаляем потенциальные выбросы и аномалии)
+    lines.append(f"\nРазмер данных до очистки: {len(df)} строк")
+
+    # Проверяем на пропущенные значения
+    missing_values = df.isnull().sum()
+    lines.append(f"\nПропущенные значения по столбцам:")
+    lines.append(str(missing_values[missing_values > 0]))
+
+    # Проверяем на аномальные значения в баллах
+    outlier_counts = {}
+    for col in SCORE_COLUMNS:
+        q1 = df[col].quantile(0.01)
+        q3 = df[col].quantile(0.99)
+        outliers = int(((df[col] < q1) | (df[col] > q3)).sum())
+        outlier_counts[col] = outliers
+        lines.append(f"\nАномальные значения в {col}: {outliers} ({outliers/len(df)*100:.1f}%)")
+
+    # Крайние выбросы (только 0 и 100 баллов как потенциально ошибочные) уже
+    # исключены выборками-масками над базовой таблицей
+    lines.append(f"\nУдалено записей с крайними значениями (0 или 100): {len(df) - len(prepared.cleaned)}")
+
+    lines.append(f"\nРазмер данных после очистки: {len(prepared.cleaned)} строк")
+
+    lines.append(f"\nАбитуриентов из семей без высшего образования: {len(prepared.non_higher_ed)}")
+    lines.append(f"Из них прошли подготовительные курсы: {len(prepared.with_courses)}")
+    lines.append(f"Не прошли курсы: {len(prepared.without_courses)}")
+
+    data = {
+        'validation': validation.summary(),
+        'rows_before_cleaning': len(df),
+        'rows_after_cleaning': len(prepared.cleaned),
+        'missing_values': {col: int(count) for col, count in missing_values[missing_values > 0].items()},
+        'outliers': outlier_counts,
+        'non_higher_ed': len(prepared.non_higher_ed),
+        'with_courses': len(prepared.with_courses),
+        'without_courses': len(prepared.without_courses)
+    }
+    return data, lines
+
 
 # ============================================================================
 # 3. ПРОВЕРКА ГИПОТЕЗЫ С ПОМОЩЬЮ СТАТИСТИЧЕСКИХ ПОКАЗАТЕЛЕЙ
 # ============================================================================
 
-print("\n" + "=" * 80)
-print("3. ПРОВЕРКА ГИПОТЕЗЫ СТАТИСТИЧЕСКИМИ МЕТОДАМИ")
-print("=" * 80)
-
-# Разделяем данные на группы
-group_with_courses = cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == True]
-group_without_courses = cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == False]
-
-print(f"\nРАЗМЕРЫ ГРУПП:")
-print(f"С курсами: {len(group_with_courses)} абитуриентов")
-print(f"Без курсов: {len(group_without_courses)} абитуриентов")
-
-# Описательная статистика
-print("\nОПИСАТЕЛЬНАЯ СТАТИСТИКА ПО ГРУППАМ:")
-
-stats_summary = pd.DataFrame({
-    'С курсами': group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-    'Без курсов': group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-    'Разница': group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() - 
-               group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-    'Прирост %': ((group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() - 
-                   group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean()) / 
-                  group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() * 100)
-})
-
-print(stats_summary.round(2))
-
-# T-тест для проверки статистической значимости различий
-print("\nТ-ТЕСТ ДЛЯ ПРОВЕРКИ СТАТИСТИЧЕСКОЙ ЗНАЧИМОСТИ:")
-
-for subject in ['math score', 'reading score', 'writing score', 'average_score']:
-    t_stat, p_value = stats.ttest_ind(
-        group_with_courses[subject].dropna(),
-        group_without_courses[subject].dropna(),
-        equal_var=False  # Welch's t-test
-    )
-    
-    print(f"\n{subject}:")
-    print(f"  t-статистика = {t_stat:.4f}")
-    print(f"  p-значение = {p_value:.6f}")
-    print(f"  Статистически значимо (p < 0.05): {'ДА' if p_value < 0.05 else 'НЕТ'}")
-    
-    if p_value < 0.05:
-        mean_diff = group_with_courses[subject].mean() - group_without_courses[subject].mean()
-        print(f"  Средняя разница = {mean_diff:.2f} баллов")
-
-# Дополнительные метрики
-print("\nДОПОЛНИТЕЛЬНЫЕ МЕТРИКИ:")
-
-# Процент достигших целевого показателя (60+ баллов)
-target_with_courses = len(group_with_courses[group_with_courses['average_score'] >= 60]) / len(group_with_courses) * 100
-target_without_courses = len(group_without_courses[group_without_courses['average_score'] >= 60]) / len(group_without_courses) * 100
-
-print(f"\nДостигли целевого показателя (60+ баллов):")
-print(f"  С курсами: {target_with_courses:.1f}%")
-print(f"  Без курсов: {target_without_courses:.1f}%")
-print(f"  Разница: {target_with_courses - target_without_courses:.1f}%")
-
-# Анализ по уровню образования родителей
-print("\nАНАЛИЗ ПО УРОВНЮ ОБРАЗОВАНИЯ РОДИТЕЛЕЙ:")
-
-edu_level_analysis = cleaned_hypothesis_data.groupby('parental level of education').agg({
-    'average_score': 'mean',
-    'took_prep_course': 'mean',
-    'total_score': 'count'
-}).round(2)
-
-edu_level_analysis = edu_level_analysis.rename(columns={
-    'average_score': 'Средний балл',
-    'took_prep_course': 'Доля прошедших курсы',
-    'total_score': 'Количество'
-})
-
-print(edu_level_analysis)
+def hypothesis_section(prepared):
+    """Проверка гипотезы статистическими методами"""
+    df = prepared.df
+    cleaned_hypothesis_data = prepared.non_higher_ed
+    group_with_courses = prepared.with_courses
+    group_without_courses = prepared.without_courses
+    lines = []
+    banner(lines, "3. ПРОВЕРКА ГИПОТЕЗЫ СТАТИСТИЧЕСКИМИ МЕТОДАМИ")
+
+    lines.append(f"\nРАЗМЕРЫ ГРУПП:")
+    lines.append(f"С курсами: {len(group_with_courses)} абитуриентов")
+    lines.append(f"Без курсов: {len(group_without_courses)} абитуриентов")
+
+    # Описательная статистика
+    lines.append("\nОПИСАТЕЛЬНАЯ СТАТИСТИКА ПО ГРУППАМ:")
+
+    summary_columns = SCORE_COLUMNS + ['average_score']
+    with_means = group_with_courses[summary_columns].mean()
+    without_means = group_without_courses[summary_columns].mean()
+    stats_summary = pd.DataFrame({
+        'С курсами': with_means,
+        'Без курсов': without_means,
+        'Разница': with_means - without_means,
+        'Прирост %': (with_means - without_means) / without_means * 100
+    })
+
+    lines.append(str(stats_summary.round(2)))
+
+    # T-тест для проверки статистической значимости различий
+    lines.append("\nТ-ТЕСТ ДЛЯ ПРОВЕРКИ СТАТИСТИЧЕСКОЙ ЗНАЧИМОСТИ:")
+
+    t_tests = {}
+    for subject in summary_columns:
+        t_stat, p_value = stats.ttest_ind(
+            group_with_courses[subject].dropna(),
+            group_without_courses[subject].dropna(),
+            equal_var=False  # Welch's t-test
+        )
+        t_tests[subject] = {'t_stat': float(t_stat), 'p_value': float(p_value), 'significant': bool(p_value < 0.05)}
+
+        lines.append(f"\n{subject}:")
+        lines.append(f"  t-статистика = {t_stat:.4f}")
+        lines.append(f"  p-значение = {p_value:.6f}")
+        lines.append(f"  Статистически значимо (p < 0.05): {'ДА' if p_value < 0.05 else 'НЕТ'}")
+
+        if p_value < 0.05:
+            mean_diff = group_with_courses[subject].mean() - group_without_courses[subject].mean()
+            lines.append(f"  Средняя разница = {mean_diff:.2f} баллов")
+
+    # Дополнительные метрики
+    lines.append("\nДОПОЛНИТЕЛЬНЫЕ МЕТРИКИ:")
+
+    # Процент достигших целевого показателя (60+ баллов)
+    target_with_courses = group_with_courses.count(df['target_group']) / len(group_with_courses) * 100
+    target_without_courses = group_without_courses.count(df['target_group']) / len(group_without_courses) * 100
+
+    lines.append(f"\nДостигли целевого показателя (60+ баллов):")
+    lines.append(f"  С курсами: {target_with_courses:.1f}%")
+    lines.append(f"  Без курсов: {target_without_courses:.1f}%")
+    lines.append(f"  Разница: {target_with_courses - target_without_courses:.1f}%")
+
+    # Анализ по уровню образования родителей
+    lines.append("\nАНАЛИЗ ПО УРОВНЮ ОБРАЗОВАНИЯ РОДИТЕЛЕЙ:")
+
+    edu_level_analysis = cleaned_hypothesis_data[
+        ['parental level of education', 'average_score', 'took_prep_course', 'total_score']
+    ].groupby('parental level of education').agg({
+        'average_score': 'mean',
+        'took_prep_course': 'mean',
+        'total_score': 'count'
+    }).round(2)
+
+    edu_level_analysis = edu_level_analysis.rename(columns={
+        'average_score': 'Средний балл',
+        'took_prep_course': 'Доля прошедших курсы',
+        'total_score': 'Количество'
+    })
+
+    lines.append(str(edu_level_analysis))
+
+    data = {
+        'stats_summary': stats_summary,
+        't_tests': t_tests,
+        'target_with_courses': target_with_courses,
+        'target_without_courses': target_without_courses,
+        'edu_level_analysis': edu_level_analysis
+    }
+    return data, lines
+
 
 # ============================================================================
 # 4. МАТРИЦА ДИАГРАММ ДЛЯ ВИЗУАЛИЗАЦИИ РЕЗУЛЬТАТОВ
 # ============================================================================
 
-print("\n" + "=" * 80)
-print("4. ВИЗУАЛИЗАЦИЯ РЕЗУЛЬТАТОВ")
-print("=" * 80)
-
-# Создаем матрицу диаграмм
-fig, axes = plt.subplots(3, 3, figsize=(18, 15))
-fig.suptitle('Анализ влияния подготовительных курсов на абитуриентов из семей без высшего образования', 
-             fontsize=16, fontweight='bold')
-
-# 1. Распределение баллов по предметам (гистограммы)
-subjects = ['math score', 'reading score', 'writing score']
-colors = ['#FF6B6B', '#4ECDC4', '#45B7D1']
-
-for i, (subject, color) in enumerate(zip(subjects, colors)):
-    ax = axes[0, i]
-    ax.hist([group_without_courses[subject], group_with_courses[subject]], 
-            bins=20, alpha=0.7, label=['Без курсов', 'С курсами'], color=[color, color])
-    ax.set_title(f'Распределение {subject.replace(" score", "")}', fontweight='bold')
-    ax.set_xlabel('Баллы')
-    ax.set_ylabel('Количество')
-    ax.legend()
+def charts_section(prepared, output_path):
+    """Матрица диаграмм 3x3, сохраняемая в файл"""
+    df = prepared.df
+    cleaned_hypothesis_data = prepared.non_higher_ed
+    group_with_courses = prepared.with_courses
+    group_without_courses = prepared.without_courses
+    lines = []
+    banner(lines, "4. ВИЗУАЛИЗАЦИЯ РЕЗУЛЬТАТОВ")
+
+    # Создаем матрицу диаграмм (через Figure, без глобального состояния pyplot,
+    # чтобы разделы могли строиться в соседних потоках)
+    fig = Figure(figsize=(18, 15))
+    axes = fig.subplots(3, 3)
+    fig.suptitle('Анализ влияния подготовительных курсов на абитуриентов из семей без высшего образования',
+                 fontsize=16, fontweight='bold')
+
+    # 1. Распределение баллов по предметам (гистограммы)
+    subjects = SCORE_COLUMNS
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1']
+
+    for i, (subject, color) in enumerate(zip(subjects, colors)):
+        ax = axes[0, i]
+        ax.hist([group_without_courses[subject], group_with_courses[subject]],
+                bins=20, alpha=0.7, label=['Без курсов', 'С курсами'], color=[color, color])
+        ax.set_title(f'Распределение {subject.replace(" score", "")}', fontweight='bold')
+        ax.set_xlabel('Баллы')
+        ax.set_ylabel('Количество')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    # 2. Box plot сравнения средних баллов
+    ax = axes[0, 2]
+    box_data = [group_without_courses['average_score'], group_with_courses['average_score']]
+    ax.boxplot(box_data, labels=['Без курсов', 'С курсами'], patch_artist=True,
+               boxprops=dict(facecolor='lightblue', color='darkblue'),
+               medianprops=dict(color='red'))
+    ax.set_title('Сравнение средних баллов', fontweight='bold')
+    ax.set_ylabel('Средний балл')
     ax.grid(True, alpha=0.3)
 
-# 2. Box plot сравнения средних баллов
-ax = axes[0, 2]
-box_data = [group_without_courses['average_score'], group_with_courses['average_score']]
-ax.boxplot(box_data, labels=['Без курсов', 'С курсами'], patch_artist=True,
-           boxprops=dict(facecolor='lightblue', color='darkblue'),
-           medianprops=dict(color='red'))
-ax.set_title('Сравнение средних баллов', fontweight='bold')
-ax.set_ylabel('Средний балл')
-ax.grid(True, alpha=0.3)
-
-# 3. Столбчатая диаграмма средних баллов по предметам
-ax = axes[1, 0]
-x = np.arange(len(subjects))
-width = 0.35
-
-with_course_means = [group_with_courses[subject].mean() for subject in subjects]
-without_course_means = [group_without_courses[subject].mean() for subject in subjects]
-
-bars1 = ax.bar(x - width/2, without_course_means, width, label='Без курсов', color='#FF9999')
-bars2 = ax.bar(x + width/2, with_course_means, width, label='С курсами', color='#66B2FF')
-
-ax.set_xlabel('Предметы')
-ax.set_ylabel('Средний балл')
-ax.set_title('Средние баллы по предметам', fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels(['Математика', 'Чтение', 'Письмо'])
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-
-# 4. Доля достигших целевого показателя
-ax = axes[1, 1]
-categories = ['Достигли 60+', 'Не достигли 60+']
-with_course_counts = [
-    len(group_with_courses[group_with_courses['average_score'] >= 60]),
-    len(group_with_courses[group_with_courses['average_score'] < 60])
-]
-without_course_counts = [
-    len(group_without_courses[group_without_courses['average_score'] >= 60]),
-    len(group_without_courses[group_without_courses['average_score'] < 60])
-]
-
-x = np.arange(len(categories))
-width = 0.35
-
-bars1 = ax.bar(x - width/2, without_course_counts, width, label='Без курсов', color='#FF9999')
-bars2 = ax.bar(x + width/2, with_course_counts, width, label='С курсами', color='#66B2FF')
-
-ax.set_xlabel('Результат')
-ax.set_ylabel('Количество абитуриентов')
-ax.set_title('Достижение целевого показателя (60+)', fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels(categories)
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-
-# Добавляем значения на столбцы
-for bars in [bars1, bars2]:
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 3,
-                f'{int(height)}', ha='center', va='bottom')
-
-# 5. Распределение по образованию родителей
-ax = axes[1, 2]
-edu_counts = cleaned_hypothesis_data['parental level of education'].value_counts()
-edu_counts.plot(kind='bar', ax=ax, color='#FFA07A')
-ax.set_title('Распределение по образованию родителей', fontweight='bold')
-ax.set_xlabel('Уровень образования')
-ax.set_ylabel('Количество')
-ax.tick_params(axis='x', rotation=45)
-ax.grid(True, alpha=0.3, axis='y')
-
-# 6. Сравнение по полу
-ax = axes[2, 0]
-gender_course = pd.crosstab(cleaned_hypothesis_data['gender'], 
-                           cleaned_hypothesis_data['took_prep_course'])
-gender_course.plot(kind='bar', ax=ax, color=['#FF9999', '#66B2FF'])
-ax.set_title('Посещение курсов по полу', fontweight='bold')
-ax.set_xlabel('Пол')
-ax.set_ylabel('Количество')
-ax.legend(['Не проходили', 'Проходили'])
-ax.grid(True, alpha=0.3, axis='y')
-
-# 7. Корреляционная матрица
-ax = axes[2, 1]
-corr_matrix = cleaned_hypothesis_data[['math score', 'reading score', 'writing score', 
-                                       'average_score', 'took_prep_course']].corr()
-im = ax.imshow(corr_matrix, cmap='coolwarm', aspect='auto')
-ax.set_title('Корреляционная матрица', fontweight='bold')
-ax.set_xticks(range(len(corr_matrix.columns)))
-ax.set_yticks(range(len(corr_matrix.columns)))
-ax.set_xticklabels(corr_matrix.columns, rotation=45, ha='right')
-ax.set_yticklabels(corr_matrix.columns)
-
-# Добавляем значения в ячейки
-for i in range(len(corr_matrix.columns)):
-    for j in range(len(corr_matrix.columns)):
-        text = ax.text(j, i, f'{corr_matrix.iloc[i, j]:.2f}',
-                       ha="center", va="center", color="white" if abs(corr_matrix.iloc[i, j]) > 0.5 else "black")
-
-# 8. Распределение по типу обеда
-ax = axes[2, 2]
-lunch_dist = pd.crosstab(cleaned_hypothesis_data['lunch'], 
-                        cleaned_hypothesis_data['took_prep_course'])
-lunch_dist.plot(kind='bar', ax=ax, color=['#FF9999', '#66B2FF'])
-ax.set_title('Посещение курсов по типу обеда', fontweight='bold')
-ax.set_xlabel('Тип обеда')
-ax.set_ylabel('Количество')
-ax.legend(['Не проходили', 'Проходили'])
-ax.tick_params(axis='x', rotation=0)
-ax.grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.show()
+    # 3. Столбчатая диаграмма средних баллов по предметам
+    ax = axes[1, 0]
+    x = np.arange(len(subjects))
+    width = 0.35
+
+    with_course_means = [group_with_courses[subject].mean() for subject in subjects]
+    without_course_means = [group_without_courses[subject].mean() for subject in subjects]
+
+    bars1 = ax.bar(x - width/2, without_course_means, width, label='Без курсов', color='#FF9999')
+    bars2 = ax.bar(x + width/2, with_course_means, width, label='С курсами', color='#66B2FF')
+
+    ax.set_xlabel('Предметы')
+    ax.set_ylabel('Средний балл')
+    ax.set_title('Средние баллы по предметам', fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(['Математика', 'Чтение', 'Письмо'])
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+
+    # 4. Доля достигших целевого показателя
+    ax = axes[1, 1]
+    categories = ['Достигли 60+', 'Не достигли 60+']
+    with_course_counts = [
+        group_with_courses.count(df['target_group']),
+        group_with_courses.count(~df['target_group'])
+    ]
+    without_course_counts = [
+        group_without_courses.count(df['target_group']),
+        group_without_courses.count(~df['target_group'])
+    ]
+
+    x = np.arange(len(categories))
+    width = 0.35
+
+    bars1 = ax.bar(x - width/2, without_course_counts, width, label='Без курсов', color='#FF9999')
+    bars2 = ax.bar(x + width/2, with_course_counts, width, label='С курсами', color='#66B2FF')
+
+    ax.set_xlabel('Результат')
+    ax.set_ylabel('Количество абитуриентов')
+    ax.set_title('Достижение целевого показателя (60+)', fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(categories)
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+
+    # Добавляем значения на столбцы
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 3,
+                    f'{int(height)}', ha='center', va='bottom')
+
+    # 5. Распределение по образованию родителей
+    ax = axes[1, 2]
+    edu_counts = cleaned_hypothesis_data['parental level of education'].value_counts()
+    edu_counts.plot(kind='bar', ax=ax, color='#FFA07A')
+    ax.set_title('Распределение по образованию родителей', fontweight='bold')
+    ax.set_xlabel('Уровень образования')
+    ax.set_ylabel('Количество')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3, axis='y')
+
+    # 6. Сравнение по полу
+    ax = axes[2, 0]
+    gender_course = pd.crosstab(cleaned_hypothesis_data['gender'],
+                               cleaned_hypothesis_data['took_prep_course'])
+    gender_course.plot(kind='bar', ax=ax, color=['#FF9999', '#66B2FF'])
+    ax.set_title('Посещение курсов по полу', fontweight='bold')
+    ax.set_xlabel('Пол')
+    ax.set_ylabel('Количество')
+    ax.legend(['Не проходили', 'Проходили'])
+    ax.grid(True, alpha=0.3, axis='y')
+
+    # 7. Корреляционная матрица
+    ax = axes[2, 1]
+    corr_matrix = cleaned_hypothesis_data[['math score', 'reading score', 'writing score',
+                                           'average_score', 'took_prep_course']].corr()
+    im = ax.imshow(corr_matrix, cmap='coolwarm', aspect='auto')
+    ax.set_title('Корреляционная матрица', fontweight='bold')
+    ax.set_xticks(range(len(corr_matrix.columns)))
+    ax.set_yticks(range(len(corr_matrix.columns)))
+    ax.set_xticklabels(corr_matrix.columns, rotation=45, ha='right')
+    ax.set_yticklabels(corr_matrix.columns)
+
+    # Добавляем значения в ячейки
+    for i in range(len(corr_matrix.columns)):
+        for j in range(len(corr_matrix.columns)):
+            ax.text(j, i, f'{corr_matrix.iloc[i, j]:.2f}',
+                    ha="center", va="center", color="white" if abs(corr_matrix.iloc[i, j]) > 0.5 else "black")
+
+    # 8. Распределение по типу обеда
+    ax = axes[2, 2]
+    lunch_dist = pd.crosstab(cleaned_hypothesis_data['lunch'],
+                            cleaned_hypothesis_data['took_prep_course'])
+    lunch_dist.plot(kind='bar', ax=ax, color=['#FF9999', '#66B2FF'])
+    ax.set_title('Посещение курсов по типу обеда', fontweight='bold')
+    ax.set_xlabel('Тип обеда')
+    ax.set_ylabel('Количество')
+    ax.legend(['Не проходили', 'Проходили'])
+    ax.tick_params(axis='x', rotation=0)
+    ax.grid(True, alpha=0.3, axis='y')
+
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=100)
+
+    lines.append(f"\nМатрица диаграмм сохранена: {output_path}")
+    return {'charts': output_path}, lines
+
 
 # ============================================================================
 # 5. ВЫВОДЫ И РЕКОМЕНДАЦИИ
 # ============================================================================
 
-print("\n" + "=" * 80)
-print("5. ОСНОВНЫЕ ВЫВОДЫ И РЕКОМЕНДАЦИИ")
-print("=" * 80)
-
-print("\n📊 РЕЗУЛЬТАТЫ ПРОВЕРКИ ГИПОТЕЗЫ:")
-print(f"   Гипотеза: 'Посещение подготовительных курсов повышает результаты экзаменов у")
-print(f"   абитуриентов из семей, где оба родителя не имеют высшего образования'")
-
-print(f"\n✅ ПОДТВЕРЖДЕНО:")
-print(f"   1. Абитуриенты, прошедшие курсы, имеют средний балл на {stats_summary.loc['average_score', 'Разница']:.1f} баллов выше")
-print(f"   2. Разница статистически значима (p < 0.05)")
-print(f"   3. Доля достигших 60+ баллов выше на {target_with_courses - target_without_courses:.1f}%")
-
-print(f"\n📈 КЛЮЧЕВЫЕ МЕТРИКИ:")
-print(f"   • Средний балл с курсами: {group_with_courses['average_score'].mean():.1f}")
-print(f"   • Средний балл без курсов: {group_without_courses['average_score'].mean():.1f}")
-print(f"   • Прирост за счет курсов: {stats_summary.loc['average_score', 'Прирост %']:.1f}%")
-print(f"   • Наибольший прирост в: {'письме' if stats_summary.loc['writing score', 'Разница'] == stats_summary.loc[['math score', 'reading score', 'writing score'], 'Разница'].max() else 'математике' if stats_summary.loc['math score', 'Разница'] == stats_summary.loc[['math score', 'reading score', 'writing score'], 'Разница'].max() else 'чтении'}")
-
-print(f"\n🎯 РЕКОМЕНДАЦИИ ДЛЯ БИЗНЕСА:")
-print(f"   1. Сфокусироваться на абитуриентах из семей без высшего образования")
-print(f"   2. Разработать специализированные курсы с акцентом на письменную часть")
-print(f"   3. Предложить льготные условия для абитуриентов с бесплатным питанием")
-print(f"   4. Создать мотивационные программы для родителей с средним образованием")
-
-print(f"\n💡 ПЕРСПЕКТИВНЫЕ НАПРАВЛЕНИЯ:")
-max_diff_subject = ['математике', 'чтении', 'письме'][np.argmax([
-    stats_summary.loc['math score', 'Разница'],
-    stats_summary.loc['reading score', 'Разница'],
-    stats_summary.loc['writing score', 'Разница']
-])]
-print(f"   1. Интенсивные онлайн-курсы по {max_diff_subject}")
-print(f"   2. Групповые занятия для детей из одинаковых социальных групп")
-print(f"   3. Программа 'Родитель + Ребенок' для семей без высшего образования")
-
-print(f"\n📋 СЛЕДУЮЩИЕ ШАГИ:")
-print(f"   1. Провести A/B тестирование различных форматов курсов")
-print(f"   2. Изучить оптимальную продолжительность курсов")
-print(f"   3. Проанализировать ценовую чувствительность целевой аудитории")
-
-# Дополнительный анализ для полноты картины
-print("\n" + "=" * 80)
-print("ДОПОЛНИТЕЛЬНЫЙ АНАЛИЗ ДЛЯ ПРИНЯТИЯ РЕШЕНИЙ")
-print("=" * 80)
-
-# Анализ рентабельности
-avg_score_diff = stats_summary.loc['average_score', 'Разница']
-potential_students = len(cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == False])
-
-print(f"\n💰 ПОТЕНЦИАЛ РЫНКА:")
-print(f"   • Потенциальных клиентов (еще не проходили курсы): {potential_students}")
-print(f"   • Средний прирост баллов: {avg_score_diff:.1f}")
-print(f"   • Вероятность достижения 60+ баллов повышается на: {target_with_courses - target_without_courses:.1f}%")
-
-# Анализ по полу
-male_with_courses = len(group_with_courses[group_with_courses['gender'] == 'male'])
-male_without_courses = len(group_without_courses[group_without_courses['gender'] == 'male'])
-female_with_courses = len(group_with_courses[group_with_courses['gender'] == 'female'])
-female_without_courses = len(group_without_courses[group_without_courses['gender'] == 'female'])
-
-print(f"\n👥 РАСПРЕДЕЛЕНИЕ ПО ПОЛУ:")
-print(f"   • Мужчины с курсами: {male_with_courses} ({male_with_courses/len(group_with_courses)*100:.1f}%)")
-print(f"   • Мужчины без курсов: {male_without_courses} ({male_without_courses/len(group_without_courses)*100:.1f}%)")
-print(f"   • Женщины с курсами: {female_with_courses} ({female_with_courses/len(group_with_courses)*100:.1f}%)")
-print(f"   • Женщины без курсов: {female_without_courses} ({female_without_courses/len(group_without_courses)*100:.1f}%)")
+def conclusions_section(prepared, hypothesis):
+    """Выводы и рекомендации (по результатам проверки гипотезы)"""
+    df = prepared.df
+    group_with_courses = prepared.with_courses
+    group_without_courses = prepared.without_courses
+    stats_summary = hypothesis['stats_summary']
+    target_with_courses = hypothesis['target_with_courses']
+    target_without_courses = hypothesis['target_without_courses']
+    lines = []
+    banner(lines, "5. ОСНОВНЫЕ ВЫВОДЫ И РЕКОМЕНДАЦИИ")
+
+    lines.append("\n📊 РЕЗУЛЬТАТЫ ПРОВЕРКИ ГИПОТЕЗЫ:")
+    lines.append(f"   Гипотеза: 'Посещение подготовительных курсов повышает результаты экзаменов у")
+    lines.append(f"   абитуриентов из семей, где оба родителя не имеют высшего образования'")
+
+    lines.append(f"\n✅ ПОДТВЕРЖДЕНО:")
+    lines.append(f"   1. Абитуриенты, прошедшие курсы, имеют средний балл на {stats_summary.loc['average_score', 'Разница']:.1f} баллов выше")
+    lines.append(f"   2. Разница статистически значима (p < 0.05)")
+    lines.append(f"   3. Доля достигших 60+ баллов выше на {target_with_courses - target_without_courses:.1f}%")
+
+    lines.append(f"\n📈 КЛЮЧЕВЫЕ МЕТРИКИ:")
+    lines.append(f"   • Средний балл с курсами: {group_with_courses['average_score'].mean():.1f}")
+    lines.append(f"   • Средний балл без курсов: {group_without_courses['average_score'].mean():.1f}")
+    lines.append(f"   • Прирост за счет курсов: {stats_summary.loc['average_score', 'Прирост %']:.1f}%")
+    lines.append(f"   • Наибольший прирост в: {'письме' if stats_summary.loc['writing score', 'Разница'] == stats_summary.loc[['math score', 'reading score', 'writing score'], 'Разница'].max() else 'математике' if stats_summary.loc['math score', 'Разница'] == stats_summary.loc[['math score', 'reading score', 'writing score'], 'Разница'].max() else 'чтении'}")
+
+    lines.append(f"\n🎯 РЕКОМЕНДАЦИИ ДЛЯ БИЗНЕСА:")
+    lines.append(f"   1. Сфокусироваться на абитуриентах из семей без высшего образования")
+    lines.append(f"   2. Разработать специализированные курсы с акцентом на письменную часть")
+    lines.append(f"   3. Предложить льготные условия для абитуриентов с бесплатным питанием")
+    lines.append(f"   4. Создать мотивационные программы для родителей с средним образованием")
+
+    lines.append(f"\n💡 ПЕРСПЕКТИВНЫЕ НАПРАВЛЕНИЯ:")
+    max_diff_subject = ['математике', 'чтении', 'письме'][np.argmax([
+        stats_summary.loc['math score', 'Разница'],
+        stats_summary.loc['reading score', 'Разница'],
+        stats_summary.loc['writing score', 'Разница']
+    ])]
+    lines.append(f"   1. Интенсивные онлайн-курсы по {max_diff_subject}")
+    lines.append(f"   2. Групповые занятия для детей из одинаковых социальных групп")
+    lines.append(f"   3. Программа 'Родитель + Ребенок' для семей без высшего образования")
+
+    lines.append(f"\n📋 СЛЕДУЮЩИЕ ШАГИ:")
+    lines.append(f"   1. Провести A/B тестирование различных форматов курсов")
+    lines.append(f"   2. Изучить оптимальную продолжительность курсов")
+    lines.append(f"   3. Проанализировать ценовую чувствительность целевой аудитории")
+
+    # Дополнительный анализ для полноты картины
+    banner(lines, "ДОПОЛНИТЕЛЬНЫЙ АНАЛИЗ ДЛЯ ПРИНЯТИЯ РЕШЕНИЙ")
+
+    # Анализ рентабельности
+    avg_score_diff = stats_summary.loc['average_score', 'Разница']
+    potential_students = len(group_without_courses)
+
+    lines.append(f"\n💰 ПОТЕНЦИАЛ РЫНКА:")
+    lines.append(f"   • Потенциальных клиентов (еще не проходили курсы): {potential_students}")
+    lines.append(f"   • Средний прирост баллов: {avg_score_diff:.1f}")
+    lines.append(f"   • Вероятность достижения 60+ баллов повышается на: {target_with_courses - target_without_courses:.1f}%")
+
+    # Анализ по полу
+    male_with_courses = group_with_courses.count(df['gender'] == 'male')
+    male_without_courses = group_without_courses.count(df['gender'] == 'male')
+    female_with_courses = group_with_courses.count(df['gender'] == 'female')
+    female_without_courses = group_without_courses.count(df['gender'] == 'female')
+
+    lines.append(f"\n👥 РАСПРЕДЕЛЕНИЕ ПО ПОЛУ:")
+    lines.append(f"   • Мужчины с курсами: {male_with_courses} ({male_with_courses/len(group_with_courses)*100:.1f}%)")
+    lines.append(f"   • Мужчины без курсов: {male_without_courses} ({male_without_courses/len(group_without_courses)*100:.1f}%)")
+    lines.append(f"   • Женщины с курсами: {female_with_courses} ({female_with_courses/len(group_with_courses)*100:.1f}%)")
+    lines.append(f"   • Женщины без курсов: {female_without_courses} ({female_without_courses/len(group_without_courses)*100:.1f}%)")
+
+    data = {
+        'avg_score_diff': float(avg_score_diff),
+        'target_diff': float(target_with_courses - target_without_courses),
+        'max_diff_subject': max_diff_subject,
+        'potential_students': potential_students,
+        'gender': {
+            'male_with_courses': male_with_courses,
+            'male_without_courses': male_without_courses,
+            'female_with_courses': female_with_courses,
+            'female_without_courses': female_without_courses
+        }
+    }
+    return data, lines
+
+
+# ============================================================================
+# ПАКЕТНЫЙ ЗАПУСК
+# ============================================================================
+
+SECTION_NAMES = ['market', 'cleaning', 'hypothesis', 'charts', 'conclusions']
+
+
+def to_json(value):
+    """Преобразование numpy/pandas значений для json.dump"""
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_stats_csv(hypothesis, path):
+    """Сводка по предметам: средние по группам и результаты t-тестов"""
+    table = hypothesis['stats_summary'].join(pd.DataFrame(hypothesis['t_tests']).T)
+    table.index.name = 'subject'
+    table.to_csv(path, encoding='utf-8')
+
+
+def build_report(input_path, output_dir):
+    """Отчет по одному файлу: разделы 1-4 параллельно, раздел 5 после раздела 3"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    prepared = load_prepared_data(input_path, os.path.join(output_dir, 'rejects.csv'))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        market = pool.submit(market_section, prepared)
+        cleaning = pool.submit(cleaning_section, prepared)
+        hypothesis = pool.submit(hypothesis_section, prepared)
+        charts = pool.submit(charts_section, prepared, os.path.join(output_dir, 'charts.png'))
+        conclusions = pool.submit(conclusions_section, prepared, hypothesis.result()[0])
+        sections = [market.result(), cleaning.result(), hypothesis.result(), charts.result(), conclusions.result()]
+
+    text = "\n".join(line for _, lines in sections for line in lines) + "\n"
+    with open(os.path.join(output_dir, 'report.txt'), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+    report = {'input': input_path}
+    report.update({name: data for name, (data, _) in zip(SECTION_NAMES, sections)})
+    with open(os.path.join(output_dir, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=to_json)
+
+    write_stats_csv(sections[2][0], os.path.join(output_dir, 'stats.csv'))
+    return text
+
+
+def run_one(task):
+    """Задача пула процессов: отчет по одному файлу"""
+    input_path, output_dir = task
+    return input_path, output_dir, build_report(input_path, output_dir)
+
+
+def report_dirs(inputs, output_dir):
+    """Каталоги отчетов: путь файла без расширения относительно общего корня входных файлов.
+
+    Файлы с одинаковыми именами из разных каталогов (data/2023/d1.csv и
+    data/2024/d1.csv) получают разные каталоги отчетов: 2023/d1 и 2024/d1.
+    """
+    paths = [os.path.splitext(os.path.abspath(path))[0] for path in inputs]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.join(output_dir, os.path.relpath(path, root)) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетный отчет по успеваемости абитуриентов')
+    parser.add_argument('inputs', nargs='*', default=['StudentsPerformance.csv'],
+                        help='CSV-файлы с данными (по умолчанию StudentsPerformance.csv)')
+    parser.add_argument('-o', '--output-dir', default='reports',
+                        help='каталог отчетов; для каждого файла создается подкаталог по его пути и имени')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='число процессов для обработки нескольких файлов')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='не печатать текст отчета')
+    args = parser.parse_args(argv)
+
+    output_dirs = report_dirs(args.inputs, args.output_dir)
+    # Один и тот же файл (или файлы, отличающиеся только расширением) дал бы один каталог
+    duplicates = sorted({d for d in output_dirs if output_dirs.count(d) > 1})
+    if duplicates:
+        parser.error(f"несколько входных файлов пишут отчет в один каталог: {', '.join(duplicates)}")
+    tasks = list(zip(args.inputs, output_dirs))
+
+    results = []
+    failed = 0
+    parallel = len(tasks) > 1
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(tasks)))) if parallel else nullcontext() as pool:
+        # Один файл обрабатывается в этом же процессе, без пула
+        futures = [pool.submit(run_one, task) for task in tasks] if parallel else [None]
+        for task, future in zip(tasks, futures):
+            try:
+                results.append(future.result() if future is not None else run_one(task))
+            except Exception as e:
+                failed += 1
+                print(f"Ошибка обработки {task[0]}: {e}", file=sys.stderr)
+
+    for input_path, output_dir, text in results:
+        if not args.quiet:
+            print(text, end='')
+        print(f"Отчет по {input_path}: {output_dir}", file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, abort
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,50 +7,63 @@ from scipy import stats
 import io
 import base64
 import json
+import os
 from matplotlib.figure import Figure
 
+from dataset_cache import DatasetCache, DatasetWatcher
+from export import EXPORT_FORMATS, format_available, stream_table
+from pipeline import CATEGORY_VALUES, SCORE_COLUMNS, SCORE_RANGE
+
 app = Flask(__name__)
 
-# Глобальные переменные для хранения данных
-df = None
-cleaned_hypothesis_data = None
-group_with_courses = None
-group_without_courses = None
+# Каталог с наборами данных (по одному CSV на район и год) и лимит памяти кэша
+DATA_DIR = os.environ.get('STUDENTS_DATA_DIR', '.')
+DEFAULT_DATASET = os.environ.get('STUDENTS_DEFAULT_DATASET', 'StudentsPerformance')
+CACHE_MAX_BYTES = int(os.environ.get('STUDENTS_CACHE_MB', '512')) * 2**20
+# Каталог общей памяти с подготовленными столбцами (режим нескольких воркеров)
+SHARED_DIR = os.environ.get('STUDENTS_SHARED_DIR')
+# Период проверки изменений файлов с данными в секундах (0 - не проверять)
+RELOAD_INTERVAL = float(os.environ.get('STUDENTS_RELOAD_INTERVAL', '5'))
 
-def load_and_prepare_data():
-    """Загрузка и подготовка данных"""
-    global df, cleaned_hypothesis_data, group_with_courses, group_without_courses
-    
-    # Загрузка данных
-    df = pd.read_csv('StudentsPerformance.csv')
-    
-    # Подготовка данных
-    df['total_score'] = df['math score'] + df['reading score'] + df['writing score']
-    df['average_score'] = df['total_score'] / 3
-    df['target_group'] = df['average_score'] >= 60
-    
-    # Подготовка данных для гипотезы
-    bachelor_degree = "bachelor's degree"
-    master_degree = "master's degree"
-    higher_education = [bachelor_degree, master_degree]
-    
-    hypothesis_data = df.copy()
-    hypothesis_data['has_higher_edu_parents'] = hypothesis_data['parental level of education'].isin(higher_education)
-    hypothesis_data['took_prep_course'] = hypothesis_data['test preparation course'] == 'completed'
-    
-    # Очистка данных
-    hypothesis_data = hypothesis_data[
-        (hypothesis_data['math score'] > 0) & 
-        (hypothesis_data['math score'] < 100) &
-        (hypothesis_data['reading score'] > 0) & 
-        (hypothesis_data['reading score'] < 100) &
-        (hypothesis_data['writing score'] > 0) & 
-        (hypothesis_data['writing score'] < 100)
-    ]
-    
-    cleaned_hypothesis_data = hypothesis_data[hypothesis_data['has_higher_edu_parents'] == False].copy()
-    group_with_courses = cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == True]
-    group_without_courses = cleaned_hypothesis_data[cleaned_hypothesis_data['took_prep_course'] == False]
+def build_results(data):
+    """Предвычисление результатов для загруженного набора данных"""
+    hypothesis_data = generate_hypothesis_data(data)
+    return {
+        'dashboard': generate_dashboard_data(data),
+        'ideas': generate_ideas_data(data),
+        'hypothesis': hypothesis_data,
+        'recommendations': generate_recommendations_data(hypothesis_data),
+        'export': generate_export_tables(data, hypothesis_data),
+        'validation': data.validation.summary() if data.validation is not None else None
+    }
+
+def build_charts(data):
+    """Построение графиков для загруженного набора данных"""
+    return generate_visualizations(data)
+
+datasets = DatasetCache(DATA_DIR, build_results, CACHE_MAX_BYTES, SHARED_DIR, build_charts)
+
+def start_watcher():
+    """Запуск фоновой перезагрузки изменившихся наборов данных"""
+    if RELOAD_INTERVAL <= 0:
+        return None
+    watcher = DatasetWatcher(datasets, RELOAD_INTERVAL)
+    watcher.start()
+    return watcher
+
+def get_dataset(dataset_id):
+    """Набор данных по идентификатору или 404"""
+    try:
+        return datasets.get(dataset_id)
+    except KeyError:
+        abort(404)
+
+@app.context_processor
+def inject_dataset():
+    """Идентификатор набора и префикс ссылок для шаблонов"""
+    dataset_id = (request.view_args or {}).get('dataset_id', DEFAULT_DATASET)
+    url_prefix = f'/datasets/{dataset_id}' if request.path.startswith('/datasets/') else ''
+    return {'dataset_id': dataset_id, 'url_prefix': url_prefix}
 
 def create_base64_plot(fig):
     """Создание base64 изображения из matplotlib figure"""
@@ -61,18 +74,19 @@ def create_base64_plot(fig):
     plt.close(fig)
     return img_base64
 
-def generate_dashboard_data():
+def generate_dashboard_data(data):
     """Генерация данных для дашборда"""
-    target_students = df[df['target_group']]
+    df = data.df
+    target_students = int(df['target_group'].sum())
     total_students = len(df)
     
     # Основные метрики
     metrics = {
         'total_students': total_students,
-        'target_students': len(target_students),
-        'target_percentage': round(len(target_students) / total_students * 100, 1),
-        'non_target_students': total_students - len(target_students),
-        'non_target_percentage': round((total_students - len(target_students)) / total_students * 100, 1),
+        'target_students': target_students,
+        'target_percentage': round(target_students / total_students * 100, 1),
+        'non_target_students': total_students - target_students,
+        'non_target_percentage': round((total_students - target_students) / total_students * 100, 1),
         'avg_math_score': round(df['math score'].mean(), 1),
         'avg_reading_score': round(df['reading score'].mean(), 1),
         'avg_writing_score': round(df['writing score'].mean(), 1),
@@ -89,7 +103,7 @@ def generate_dashboard_data():
     education_dist = df['parental level of education'].value_counts().to_dict()
     
     # Для гипотезы
-    non_higher_ed_count = len(df[~df['parental level of education'].isin(["bachelor's degree", "master's degree"])])
+    non_higher_ed_count = int((~df['has_higher_edu_parents']).sum())
     
     return {
         'metrics': metrics,
@@ -99,17 +113,19 @@ def generate_dashboard_data():
         'non_higher_ed_percentage': round(non_higher_ed_count / total_students * 100, 1)
     }
 
-def generate_ideas_data():
+def generate_ideas_data(data):
     """Генерация данных для страницы идей"""
+    df = data.df
     
-    non_higher_ed_count = len(df[~df['parental level of education'].isin(["bachelor's degree", "master's degree"])])
+    non_higher_ed_count = int((~df['has_higher_edu_parents']).sum())
     non_higher_ed_percent = non_higher_ed_count / len(df) * 100
     
-    free_lunch_avg = df[df['lunch'] == 'free/reduced']['average_score'].mean()
-    standard_lunch_avg = df[df['lunch'] == 'standard']['average_score'].mean()
+    # Средние считаем по одному столбцу, не копируя строки целиком
+    free_lunch_avg = df['average_score'][df['lunch'] == 'free/reduced'].mean()
+    standard_lunch_avg = df['average_score'][df['lunch'] == 'standard'].mean()
     
-    group_a_avg = df[df['race/ethnicity'] == 'group A']['average_score'].mean()
-    group_e_avg = df[df['race/ethnicity'] == 'group E']['average_score'].mean()
+    group_a_avg = df['average_score'][df['race/ethnicity'] == 'group A'].mean()
+    group_e_avg = df['average_score'][df['race/ethnicity'] == 'group E'].mean()
     
     ideas = [
         {
@@ -117,7 +133,7 @@ def generate_ideas_data():
             "name": "Интенсивные онлайн-курсы по математике",
             "target": "Абитуриенты со слабой математической подготовкой",
             "rationale": f"Средний балл по математике: {df['math score'].mean():.1f}, что ниже чем по чтению ({df['reading score'].mean():.1f}) и письму ({df['writing score'].mean():.1f})",
-            "potential_market": round((len(df[df['math score'] < 60]) / len(df) * 100), 1),
+            "potential_market": round(((df['math score'] < 60).mean() * 100), 1),
             "key_metric": "math_score_below_60"
         },
         {
@@ -133,7 +149,7 @@ def generate_ideas_data():
             "name": "Программа 'Обед + Уроки'",
             "target": "Абитуриенты с бесплатным/льготным питанием",
             "rationale": f"Средний балл у абитуриентов с бесплатным питанием: {free_lunch_avg:.1f}, у остальных: {standard_lunch_avg:.1f}",
-            "potential_market": round((len(df[df['lunch'] == 'free/reduced']) / len(df) * 100), 1),
+            "potential_market": round(((df['lunch'] == 'free/reduced').mean() * 100), 1),
             "key_metric": "free_lunch_students"
         },
         {
@@ -141,7 +157,7 @@ def generate_ideas_data():
             "name": "Подготовительные курсы с фокусом на письмо",
             "target": "Абитуриенты, которым сложно дается письменная часть",
             "rationale": f"Средний балл по письму: {df['writing score'].mean():.1f}, минимальный: {df['writing score'].min()}, максимальный: {df['writing score'].max()}",
-            "potential_market": round((len(df[df['writing score'] < 60]) / len(df) * 100), 1),
+            "potential_market": round(((df['writing score'] < 60).mean() * 100), 1),
             "key_metric": "writing_score_below_60"
         },
         {
@@ -149,25 +165,29 @@ def generate_ideas_data():
             "name": "Групповые занятия по этническим группам",
             "target": "Определенные этнические группы с низкими результатами",
             "rationale": f"Разница в средних баллах между группами: Group A: {group_a_avg:.1f}, Group E: {group_e_avg:.1f}",
-            "potential_market": round((len(df[df['race/ethnicity'] == 'group A']) / len(df) * 100), 1),
+            "potential_market": round(((df['race/ethnicity'] == 'group A').mean() * 100), 1),
             "key_metric": "group_a_students"
         }
     ]
     
     return ideas
 
-def generate_hypothesis_data():
+def generate_hypothesis_data(data):
     """Генерация данных для проверки гипотезы"""
+    df = data.df
+    cleaned_hypothesis_data = data.non_higher_ed
+    group_with_courses = data.with_courses
+    group_without_courses = data.without_courses
     
     # Описательная статистика
+    columns = ['math score', 'reading score', 'writing score', 'average_score']
+    with_means = group_with_courses[columns].mean()
+    without_means = group_without_courses[columns].mean()
     stats_summary = pd.DataFrame({
-        'С курсами': group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-        'Без курсов': group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-        'Разница': group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() - 
-                   group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean(),
-        'Прирост %': ((group_with_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() - 
-                       group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean()) / 
-                      group_without_courses[['math score', 'reading score', 'writing score', 'average_score']].mean() * 100)
+        'С курсами': with_means,
+        'Без курсов': without_means,
+        'Разница': with_means - without_means,
+        'Прирост %': (with_means - without_means) / without_means * 100
     }).round(2)
     
     # T-тесты
@@ -186,11 +206,13 @@ def generate_hypothesis_data():
         }
     
     # Дополнительные метрики
-    target_with_courses = len(group_with_courses[group_with_courses['average_score'] >= 60]) / len(group_with_courses) * 100
-    target_without_courses = len(group_without_courses[group_without_courses['average_score'] >= 60]) / len(group_without_courses) * 100
+    target_with_courses = group_with_courses.count(df['target_group']) / len(group_with_courses) * 100
+    target_without_courses = group_without_courses.count(df['target_group']) / len(group_without_courses) * 100
     
     # Анализ по уровню образования
-    edu_level_analysis = cleaned_hypothesis_data.groupby('parental level of education').agg({
+    edu_level_analysis = cleaned_hypothesis_data[
+        ['parental level of education', 'average_score', 'took_prep_course', 'total_score']
+    ].groupby('parental level of education', observed=True).agg({
         'average_score': 'mean',
         'took_prep_course': 'mean',
         'total_score': 'count'
@@ -218,8 +240,12 @@ def generate_hypothesis_data():
         }
     }
 
-def generate_visualizations():
+def generate_visualizations(data):
     """Генерация всех визуализаций"""
+    df = data.df
+    cleaned_hypothesis_data = data.non_higher_ed
+    group_with_courses = data.with_courses
+    group_without_courses = data.without_courses
     visualizations = {}
     
     # 1. Гистограмма распределения средних баллов
@@ -274,12 +300,12 @@ def generate_visualizations():
     
     categories = ['Достигли 60+', 'Не достигли 60+']
     with_course_counts = [
-        len(group_with_courses[group_with_courses['average_score'] >= 60]),
-        len(group_with_courses[group_with_courses['average_score'] < 60])
+        group_with_courses.count(df['target_group']),
+        group_with_courses.count(~df['target_group'])
     ]
     without_course_counts = [
-        len(group_without_courses[group_without_courses['average_score'] >= 60]),
-        len(group_without_courses[group_without_courses['average_score'] < 60])
+        group_without_courses.count(df['target_group']),
+        group_without_courses.count(~df['target_group'])
     ]
     
     x = np.arange(len(categories))
@@ -322,34 +348,8 @@ def generate_visualizations():
     
     return visualizations
 
-@app.route('/')
-def index():
-    """Главная страница"""
-    dashboard_data = generate_dashboard_data()
-    return render_template('index.html', data=dashboard_data)
-
-@app.route('/ideas')
-def ideas():
-    """Страница с идеями продуктов"""
-    ideas_data = generate_ideas_data()
-    return render_template('ideas.html', ideas=ideas_data)
-
-@app.route('/hypothesis')
-def hypothesis():
-    """Страница с проверкой гипотезы"""
-    hypothesis_data = generate_hypothesis_data()
-    return render_template('hypothesis.html', data=hypothesis_data)
-
-@app.route('/visualization')
-def visualization():
-    """Страница с визуализациями"""
-    visualizations = generate_visualizations()
-    return render_template('visualization.html', visualizations=visualizations)
-
-@app.route('/recommendations')
-def recommendations():
-    """Страница с рекомендациями"""
-    hypothesis_data = generate_hypothesis_data()
+def generate_recommendations_data(hypothesis_data):
+    """Генерация данных для страницы рекомендаций"""
     stats_summary = pd.DataFrame(hypothesis_data['stats_summary'])
     
     # Расчет прироста
@@ -361,35 +361,161 @@ def recommendations():
         ])
     ]
     
-    recommendations_data = {
+    return {
         'avg_score_diff': round(stats_summary.loc['average_score', 'Разница'], 1),
         'target_diff': hypothesis_data['target_achievement']['difference'],
         'max_diff_subject': max_diff_subject,
         'potential_students': hypothesis_data['group_sizes']['without_courses'],
         'growth_percentage': round(stats_summary.loc['average_score', 'Прирост %'], 1)
     }
-    
+
+def generate_export_tables(data, hypothesis_data):
+    """Таблицы для выгрузки в BI-инструменты: сегменты, t-тесты, распределения"""
+    df = data.df
+    
+    # Агрегаты по всем сочетаниям категорий
+    segment_columns = list(CATEGORY_VALUES)
+    segments = df.groupby(segment_columns, observed=True).agg(
+        students=('total_score', 'size'),
+        **{col: (col, 'mean') for col in SCORE_COLUMNS + ['average_score']},
+        target_share=('target_group', 'mean')
+    ).reset_index()
+    # Категории как строки: схема одна и та же и для CSV, и для общей памяти
+    segments[segment_columns] = segments[segment_columns].astype(str)
+    
+    # Средние по группам и результаты t-тестов по каждому предмету
+    tests = pd.DataFrame(hypothesis_data['stats_summary']).rename(columns={
+        'С курсами': 'with_courses',
+        'Без курсов': 'without_courses',
+        'Разница': 'difference',
+        'Прирост %': 'growth_percent'
+    })
+    tests = tests.join(pd.DataFrame(hypothesis_data['t_tests']).T.infer_objects())
+    tests = tests.rename_axis('subject').reset_index()
+    tests['significant'] = tests['significant'].astype(bool)
+    
+    # Распределения баллов по интервалам в 5 баллов
+    bins = np.arange(SCORE_RANGE[0], SCORE_RANGE[1] + 5, 5)
+    groups = {
+        'all': data.all_rows,
+        'with_courses': data.with_courses,
+        'without_courses': data.without_courses
+    }
+    parts = []
+    for group, selection in groups.items():
+        for col in SCORE_COLUMNS + ['average_score']:
+            counts, _ = np.histogram(selection[col].to_numpy(), bins=bins)
+            parts.append(pd.DataFrame({
+                'group': group,
+                'score': col,
+                'bin_start': bins[:-1],
+                'bin_end': bins[1:],
+                'students': counts
+            }))
+    distributions = pd.concat(parts, ignore_index=True)
+    
+    return {'segments': segments, 'tests': tests, 'distributions': distributions}
+
+# Каждая страница доступна как для набора по умолчанию (/ideas),
+# так и для любого набора из каталога данных (/datasets/<id>/ideas)
+
+@app.route('/', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/')
+def index(dataset_id):
+    """Главная страница"""
+    dashboard_data = get_dataset(dataset_id).results['dashboard']
+    return render_template('index.html', data=dashboard_data)
+
+@app.route('/ideas', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/ideas')
+def ideas(dataset_id):
+    """Страница с идеями продуктов"""
+    ideas_data = get_dataset(dataset_id).results['ideas']
+    return render_template('ideas.html', ideas=ideas_data)
+
+@app.route('/hypothesis', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/hypothesis')
+def hypothesis(dataset_id):
+    """Страница с проверкой гипотезы"""
+    hypothesis_data = get_dataset(dataset_id).results['hypothesis']
+    return render_template('hypothesis.html', data=hypothesis_data)
+
+@app.route('/visualization', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/visualization')
+def visualization(dataset_id):
+    """Страница с визуализациями"""
+    visualizations = datasets.charts(get_dataset(dataset_id))
+    return render_template('visualization.html', visualizations=visualizations)
+
+@app.route('/recommendations', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/recommendations')
+def recommendations(dataset_id):
+    """Страница с рекомендациями"""
+    recommendations_data = get_dataset(dataset_id).results['recommendations']
     return render_template('recommendations.html', data=recommendations_data)
 
-@app.route('/api/dashboard')
-def api_dashboard():
+@app.route('/api/datasets')
+def api_datasets():
+    """API со списком наборов данных и состоянием кэша"""
+    return jsonify({
+        'default': DEFAULT_DATASET,
+        'available': datasets.available(),
+        'cached': datasets.cached(),
+        'cache_bytes': datasets.nbytes,
+        'cache_max_bytes': datasets.max_bytes
+    })
+
+@app.route('/api/validation', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/api/validation')
+def api_validation(dataset_id):
+    """API с итогами проверки строк при загрузке набора"""
+    data = get_dataset(dataset_id).results['validation']
+    return jsonify(data)
+
+@app.route('/api/dashboard', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/api/dashboard')
+def api_dashboard(dataset_id):
     """API для данных дашборда"""
-    data = generate_dashboard_data()
+    data = get_dataset(dataset_id).results['dashboard']
     return jsonify(data)
 
-@app.route('/api/ideas')
-def api_ideas():
+@app.route('/api/ideas', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/api/ideas')
+def api_ideas(dataset_id):
     """API для идей"""
-    data = generate_ideas_data()
+    data = get_dataset(dataset_id).results['ideas']
     return jsonify(data)
 
-@app.route('/api/hypothesis')
-def api_hypothesis():
+@app.route('/api/hypothesis', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/api/hypothesis')
+def api_hypothesis(dataset_id):
     """API для гипотезы"""
-    data = generate_hypothesis_data()
+    data = get_dataset(dataset_id).results['hypothesis']
     return jsonify(data)
 
+@app.route('/api/export', defaults={'dataset_id': DEFAULT_DATASET})
+@app.route('/datasets/<dataset_id>/api/export')
+def api_export(dataset_id):
+    """Выгрузка таблицы: ?table=segments|tests|distributions&format=csv|arrow|parquet"""
+    tables = get_dataset(dataset_id).results['export']
+    table = request.args.get('table', 'segments')
+    fmt = request.args.get('format', 'csv')
+    if table not in tables:
+        return jsonify({'error': f'Неизвестная таблица: {table}', 'tables': list(tables)}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Неизвестный формат: {fmt}', 'formats': list(EXPORT_FORMATS)}), 400
+    if not format_available(fmt):
+        return jsonify({'error': f'Формат {fmt} недоступен: не установлен pyarrow'}), 501
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_table(tables[table], fmt),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={dataset_id}-{table}.{extension}'}
+    )
+
 if __name__ == '__main__':
-    # Загружаем данные при старте
-    load_and_prepare_data()
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Загружаем набор по умолчанию при старте, остальные - по требованию
+    datasets.get(DEFAULT_DATASET)
+    start_watcher()
+    app.run(debug=True, port=5000)
@@ -0,0 +1,88 @@
+"""Сравнение пикового потребления памяти: копирующая подготовка данных и выборки-маски.
+
+Запуск из каталога student_analysis_project:
+    python benchmarks/bench_pipeline.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import HIGHER_EDUCATION, PreparedData, add_derived_columns
+
+
+def make_frame(path, rows):
+    """Синтетическая таблица нужного размера из строк исходного CSV"""
+    source = pd.read_csv(path)
+    rng = np.random.default_rng(0)
+    return source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True)
+
+
+def copying_pipeline(df):
+    """Прежняя схема: копия таблицы, отфильтрованные кадры и отдельные кадры групп"""
+    df['total_score'] = df['math score'] + df['reading score'] + df['writing score']
+    df['average_score'] = df['total_score'] / 3
+    df['target_group'] = df['average_score'] >= 60
+
+    hypothesis_data = df.copy()
+    hypothesis_data['has_higher_edu_parents'] = hypothesis_data['parental level of education'].isin(HIGHER_EDUCATION)
+    hypothesis_data['took_prep_course'] = hypothesis_data['test preparation course'] == 'completed'
+    hypothesis_data = hypothesis_data[
+        (hypothesis_data['math score'] > 0) &
+        (hypothesis_data['math score'] < 100) &
+        (hypothesis_data['reading score'] > 0) &
+        (hypothesis_data['reading score'] < 100) &
+        (hypothesis_data['writing score'] > 0) &
+        (hypothesis_data['writing score'] < 100)
+    ]
+    cleaned = hypothesis_data[hypothesis_data['has_higher_edu_parents'] == False].copy()
+    with_courses = cleaned[cleaned['took_prep_course'] == True]
+    without_courses = cleaned[cleaned['took_prep_course'] == False]
+    return cleaned, with_courses, without_courses
+
+
+def mask_pipeline(df):
+    """Новая схема: производные столбцы в базовой таблице и выборки-маски над ней"""
+    add_derived_columns(df)
+    prepared = PreparedData(df)
+    # Материализуем массивы индексов, как это происходит при первом запросе
+    for selection in (prepared.cleaned, prepared.non_higher_ed, prepared.with_courses, prepared.without_courses):
+        len(selection)
+    return prepared
+
+
+def measure(name, func, df):
+    """Пиковая и удерживаемая память сверх базовой таблицы"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{name:<12} пик: {peak / 2**20:9.1f} МБ  удерживается: {current / 2**20:9.1f} МБ  время: {elapsed:6.2f} с")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--csv', default='StudentsPerformance.csv')
+    args = parser.parse_args()
+
+    base = make_frame(args.csv, args.rows)
+    print(f"Строк: {len(base)}, базовая таблица: {base.memory_usage(deep=True).sum() / 2**20:.1f} МБ")
+
+    copying_peak = measure('копии', copying_pipeline, base.copy())
+    mask_peak = measure('маски', mask_pipeline, base.copy())
+    print(f"Снижение пикового потребления: {(1 - mask_peak / copying_peak) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Пропускная способность загрузки с проверкой строк на «грязных» данных.
+
+Запуск из каталога student_analysis_project:
+    python benchmarks/bench_validation.py --rows 1000000 --dirty 0.01
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import SCORE_COLUMNS, read_csv_checked, validate_rows
+
+
+def make_dirty_csv(source, rows, dirty, path):
+    """CSV нужного размера, в котором доля dirty строк испорчена"""
+    df = pd.read_csv(source)
+    rng = np.random.default_rng(0)
+    df = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True).astype(object)
+
+    broken = rng.random(rows) < dirty
+    kinds = rng.integers(0, 4, rows)
+    df.loc[broken & (kinds == 0), 'math score'] = 'n/a'
+    df.loc[broken & (kinds == 1), 'reading score'] = 150
+    df.loc[broken & (kinds == 2), 'race/ethnicity'] = 'group Z'
+    df.loc[broken & (kinds == 3), 'writing score'] = None
+    df.to_csv(path, index=False)
+    return int(broken.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--dirty', type=float, default=0.01)
+    parser.add_argument('--csv', default='StudentsPerformance.csv')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dirty.csv')
+        broken = make_dirty_csv(args.csv, args.rows, args.dirty, path)
+
+        start = time.perf_counter()
+        df, lines, bad_lines = read_csv_checked(path)
+        parsed = time.perf_counter()
+        valid, rejects, report = validate_rows(df, bad_lines, lines)
+        done = time.perf_counter()
+
+    print(f"Строк: {report.rows}, испорчено: {broken}, отклонено: {report.rejected}")
+    print(f"Разбор CSV:   {parsed - start:6.2f} с")
+    print(f"Проверка:     {done - parsed:6.2f} с  ({report.rows_per_second:,.0f} строк/с)")
+    print(f"Всего:        {done - start:6.2f} с  ({report.rows / (done - start):,.0f} строк/с)")
+    print(f"Типы баллов после проверки: {[str(valid[col].dtype) for col in SCORE_COLUMNS]}")
+
+
+if __name__ == '__main__':
+    main()
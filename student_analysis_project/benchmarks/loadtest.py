@@ -0,0 +1,237 @@
+"""Нагрузочный тест маршрутов приложения с проверкой бюджета задержки.
+
+Приложение запускается на локальном сервере werkzeug в отдельном процессе, чтобы
+сервер не делил GIL с потоками клиентов (или задается адрес уже запущенного
+сервера, например gunicorn). Посетители открывают страницы по заданной смеси
+маршрутов. Дополнительно открытые дашборды опрашивают /api/dashboard раз в
+--poll-interval секунд, как index.html.
+Для каждого маршрута печатаются пропускная способность и перцентили задержки.
+Код выхода 1 означает, что у какого-то маршрута p99 больше бюджета или были ошибки.
+
+Запуск из каталога student_analysis_project:
+    python benchmarks/loadtest.py --users 16 --pollers 200 --duration 60
+    python benchmarks/loadtest.py --budget /visualization=800 --budget /=150
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --users 32
+"""
+import argparse
+import http.client
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Смесь маршрутов по умолчанию: маршрут и его вес
+DEFAULT_MIX = {
+    '/': 4,
+    '/hypothesis': 2,
+    '/visualization': 1,
+    '/ideas': 1,
+    '/recommendations': 1,
+    '/api/dashboard': 2,
+}
+POLL_ROUTE = '/api/dashboard'
+# Бюджет p99 в миллисекундах для маршрутов без явного --budget
+DEFAULT_BUDGET_MS = 250.0
+# Время на загрузку набора данных и запуск локального сервера, с
+STARTUP_TIMEOUT = 120
+
+
+def parse_pairs(values, convert):
+    """Разбор аргументов вида маршрут=число"""
+    pairs = {}
+    for value in values:
+        route, sep, number = value.rpartition('=')
+        if not sep or not route.startswith('/'):
+            raise argparse.ArgumentTypeError(f'Ожидается маршрут=число: {value}')
+        pairs[route] = convert(number)
+    return pairs
+
+
+def serve(ports):
+    """Процесс сервера: приложение на свободном порту, номер порта - в очередь ports"""
+    from werkzeug.serving import make_server
+
+    from app import DEFAULT_DATASET, app, datasets
+
+    # Журнал запросов и трассировки не печатаются: ошибки считаются в отчете
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app.logger.setLevel(logging.CRITICAL)
+    datasets.get(DEFAULT_DATASET)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def start_local_server():
+    """Запуск приложения в отдельном процессе; возвращает базовый URL и процесс"""
+    # spawn: сервер стартует в чистом интерпретаторе, без состояния процесса-клиента
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    process = context.Process(target=serve, args=(ports,), name='loadtest-server', daemon=True)
+    process.start()
+    try:
+        port = ports.get(timeout=STARTUP_TIMEOUT)
+    except queue.Empty:
+        process.terminate()
+        raise RuntimeError('Локальный сервер не запустился') from None
+    return f'http://127.0.0.1:{port}', process
+
+
+def fetch(url, timeout):
+    """Один запрос: (задержка в секундах, успех)"""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, http.client.HTTPException, OSError):
+        # Обрыв соединения или неполный ответ под нагрузкой - тоже ошибка запроса
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def visitor(base_url, mix, think_time, deadline, timeout, seed):
+    """Посетитель: открывает страницы по смеси маршрутов до окончания теста"""
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = list(mix.values())
+    samples = []
+    while time.monotonic() < deadline:
+        route = rng.choices(routes, weights)[0]
+        latency, ok = fetch(base_url + route, timeout)
+        samples.append((route, latency, ok))
+        if think_time > 0:
+            time.sleep(rng.expovariate(1 / think_time))
+    return samples
+
+
+def poller(base_url, interval, stopped, timeout, seed):
+    """Открытый дашборд: опрос /api/dashboard с постоянным интервалом"""
+    # Дашборды открыты в разное время, поэтому опросы разнесены по интервалу
+    if stopped.wait(random.Random(seed).uniform(0, interval)):
+        return []
+    samples = []
+    while True:
+        latency, ok = fetch(base_url + POLL_ROUTE, timeout)
+        samples.append((POLL_ROUTE, latency, ok))
+        if stopped.wait(interval):
+            return samples
+
+
+def warm_up(base_url, routes, timeout):
+    """По одному запросу на маршрут: графики и кэши строятся до замера"""
+    for route in routes:
+        fetch(base_url + route, timeout)
+
+
+def summarize(samples, duration, budgets, default_budget):
+    """Строки отчета по маршрутам и признак провала"""
+    by_route = {}
+    for route, latency, ok in samples:
+        by_route.setdefault(route, []).append((latency, ok))
+
+    rows = []
+    failed = False
+    for route in sorted(by_route):
+        latencies = np.array([latency for latency, _ in by_route[route]]) * 1000
+        errors = sum(not ok for _, ok in by_route[route])
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        budget = budgets.get(route, default_budget)
+        status = 'OK' if p99 <= budget and errors == 0 else 'FAIL'
+        failed |= status == 'FAIL'
+        rows.append((route, len(latencies), len(latencies) / duration, errors,
+                     p50, p95, p99, latencies.max(), budget, status))
+    return rows, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='адрес запущенного сервера (по умолчанию - локальный werkzeug)')
+    parser.add_argument('--dataset', help='набор данных: запросы к /datasets/<id>/...')
+    parser.add_argument('--users', type=int, default=8, help='одновременных посетителей')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='средняя пауза посетителя между запросами, с (0 - без пауз)')
+    parser.add_argument('--pollers', type=int, default=100, help='открытых дашбордов')
+    parser.add_argument('--poll-interval', type=float, default=30.0, help='период опроса дашборда, с')
+    parser.add_argument('--duration', type=float, default=60.0, help='длительность теста, с')
+    parser.add_argument('--mix', action='append', default=[], metavar='МАРШРУТ=ВЕС',
+                        help='вес маршрута в смеси (можно повторять; заменяет смесь по умолчанию)')
+    parser.add_argument('--budget', action='append', default=[], metavar='МАРШРУТ=МС',
+                        help='бюджет p99 для маршрута в мс (можно повторять)')
+    parser.add_argument('--default-budget', type=float, default=DEFAULT_BUDGET_MS,
+                        help='бюджет p99 для остальных маршрутов, мс')
+    parser.add_argument('--timeout', type=float, default=30.0, help='таймаут запроса, с')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        mix = parse_pairs(args.mix, float) or DEFAULT_MIX
+        budgets = parse_pairs(args.budget, float)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        base_url, server = start_local_server()
+    try:
+        failed = run(args, base_url, mix, budgets)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+    if failed:
+        print('Бюджет задержки превышен или были ошибки', file=sys.stderr)
+        sys.exit(1)
+
+
+def run(args, base_url, mix, budgets):
+    """Прогон теста против сервера base_url; True, если бюджет нарушен"""
+    if args.dataset:
+        base_url += f'/datasets/{args.dataset}'
+    warm_up(base_url, set(mix) | {POLL_ROUTE}, args.timeout)
+
+    print(f'{base_url}: {args.users} посетителей, {args.pollers} дашбордов '
+          f'(опрос раз в {args.poll_interval:g} с), {args.duration:g} с')
+
+    stopped = threading.Event()
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.users + args.pollers) as pool:
+        futures = [
+            pool.submit(visitor, base_url, mix, args.think_time, deadline, args.timeout, args.seed + i)
+            for i in range(args.users)
+        ]
+        futures += [
+            pool.submit(poller, base_url, args.poll_interval, stopped, args.timeout, args.seed + args.users + i)
+            for i in range(args.pollers)
+        ]
+        stopped.wait(args.duration)
+        stopped.set()
+        samples = [sample for future in futures for sample in future.result()]
+    duration = time.monotonic() - start
+
+    rows, failed = summarize(samples, duration, budgets, args.default_budget)
+    print(f"\n{'Маршрут':<20}{'запросов':>9}{'в сек':>9}{'ошибок':>8}"
+          f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'бюджет':>9}  статус")
+    for route, count, rps, errors, p50, p95, p99, worst, budget, status in rows:
+        print(f'{route:<20}{count:>9}{rps:>9.1f}{errors:>8}'
+              f'{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{worst:>9.1f}{budget:>9.0f}  {status}')
+    print(f'\nВсего: {len(samples)} запросов, {len(samples) / duration:.1f} в секунду; задержки в мс')
+    return failed
+
+
+if __name__ == '__main__':
+    main()
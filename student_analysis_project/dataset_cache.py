@@ -0,0 +1,232 @@
+import logging
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from pipeline import load_prepared_data
+from shared_store import open_shared, source_version
+
+logger = logging.getLogger(__name__)
+
+# Допустимые идентификаторы наборов данных: имя CSV-файла без расширения
+DATASET_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+def estimate_nbytes(value):
+    """Приблизительный объем памяти значения: таблицы, массивы, строки и вложенные контейнеры"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Mapping):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(key) + estimate_nbytes(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class Dataset:
+    """Снимок набора данных: подготовленные данные и предвычисленные результаты.
+
+    После построения снимок не меняется (кроме графиков, которые строятся один
+    раз при первом запросе); обновление данных - это замена снимка целиком.
+    """
+
+    def __init__(self, dataset_id, version, prepared, results, shared=False):
+        self.dataset_id = dataset_id
+        self.version = version
+        self.prepared = prepared
+        self.results = MappingProxyType(results)
+        self.shared = shared
+        # Таблица и все предвычисленные результаты; графики добавляются при построении
+        self.nbytes = estimate_nbytes(prepared.df) + estimate_nbytes(results)
+        self.charts = None
+        self.charts_lock = threading.Lock()
+
+
+class DatasetCache:
+    """LRU-кэш наборов данных, ограниченный суммарным объемом памяти.
+
+    Наборы загружаются из data_dir по требованию; build получает подготовленные
+    данные и возвращает словарь предвычисленных результатов, build_charts -
+    словарь графиков. Если задан shared_dir, наборы, опубликованные загрузчиком
+    (shared_store.py), отображаются в память вместо разбора CSV.
+    """
+
+    def __init__(self, data_dir, build, max_bytes, shared_dir=None, build_charts=None):
+        self.data_dir = data_dir
+        self.build = build
+        self.build_charts = build_charts
+        self.max_bytes = max_bytes
+        self.shared_dir = shared_dir
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._pending = {}
+
+    def path_for(self, dataset_id):
+        """Путь к CSV набора данных или None, если такого набора нет"""
+        if not DATASET_ID_PATTERN.match(dataset_id):
+            return None
+        path = os.path.join(self.data_dir, dataset_id + '.csv')
+        return path if os.path.isfile(path) else None
+
+    def rejects_path_for(self, dataset_id):
+        """Файл для строк набора, отклоненных при проверке"""
+        return os.path.join(self.data_dir, 'rejects', dataset_id + '.csv')
+
+    def available(self):
+        """Идентификаторы всех наборов данных в каталоге"""
+        return sorted(
+            name[:-4] for name in os.listdir(self.data_dir)
+            if name.endswith('.csv') and DATASET_ID_PATTERN.match(name[:-4])
+        )
+
+    def cached(self):
+        """Идентификаторы загруженных наборов, от давно использованных к недавним"""
+        with self._lock:
+            return list(self._datasets)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(dataset.nbytes for dataset in self._datasets.values())
+
+    def get(self, dataset_id):
+        """Набор данных из кэша или с диска; KeyError, если такого набора нет"""
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+                return dataset
+            # Один поток загружает набор, остальные ждут его на той же блокировке
+            loading = self._loading.setdefault(dataset_id, threading.Lock())
+
+        with loading:
+            with self._lock:
+                dataset = self._datasets.get(dataset_id)
+                if dataset is not None:
+                    self._datasets.move_to_end(dataset_id)
+                    return dataset
+
+            try:
+                dataset = self._load(dataset_id)
+                with self._lock:
+                    self._datasets[dataset_id] = dataset
+                    self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(dataset_id, None)
+            return dataset
+
+    def charts(self, dataset):
+        """Графики снимка, построенные один раз при первом запросе"""
+        with dataset.charts_lock:
+            if dataset.charts is not None:
+                return dataset.charts
+            charts = self.build_charts(dataset.prepared)
+            dataset.charts = charts
+            dataset.nbytes += estimate_nbytes(charts)
+
+        # Графики увеличили снимок: возможно, пора вытеснить другие наборы
+        with self._lock:
+            self._evict()
+        return charts
+
+    def refresh(self):
+        """Пересборка загруженных наборов, исходные файлы которых изменились.
+
+        Новый снимок строится целиком вне блокировки и подменяет старый одним
+        присваиванием, поэтому запросы видят либо старые, либо новые данные.
+        Изменение применяется, когда версия файла не менялась между двумя
+        проверками: так не читается файл, который еще дописывается.
+        """
+        with self._lock:
+            current = list(self._datasets.values())
+
+        for old in current:
+            path = self.path_for(old.dataset_id)
+            if path is None:
+                continue
+            version = source_version(path)
+            if version == old.version:
+                self._pending.pop(old.dataset_id, None)
+                continue
+            if self._pending.get(old.dataset_id) != version:
+                self._pending[old.dataset_id] = version
+                continue
+
+            try:
+                new = self._load(old.dataset_id, require_shared=old.shared)
+            except Exception:
+                logger.exception('Не удалось перезагрузить набор %s', old.dataset_id)
+                continue
+            if new is None:
+                # Загрузчик еще не опубликовал новую версию в общей памяти
+                continue
+            if old.charts is not None:
+                self.charts(new)
+
+            with self._lock:
+                if self._datasets.get(old.dataset_id) is old:
+                    self._datasets[old.dataset_id] = new
+                    self._evict()
+            self._pending.pop(old.dataset_id, None)
+            logger.info('Набор %s обновлен до версии %s', old.dataset_id, new.version)
+
+    def _load(self, dataset_id, require_shared=False):
+        """Загрузка и предвычисление результатов вне общей блокировки"""
+        path = self.path_for(dataset_id)
+        if path is None:
+            raise KeyError(dataset_id)
+        version = source_version(path)
+
+        if self.shared_dir is not None:
+            shared = open_shared(self.shared_dir, dataset_id, path)
+            if shared is not None:
+                prepared, results = shared
+                return Dataset(dataset_id, version, prepared,
+                               results if results is not None else self.build(prepared), shared=True)
+            if require_shared:
+                return None
+
+        prepared = load_prepared_data(path, self.rejects_path_for(dataset_id))
+        return Dataset(dataset_id, version, prepared, self.build(prepared))
+
+    def _evict(self):
+        """Вытеснение давно использованных наборов сверх лимита памяти"""
+        total = sum(dataset.nbytes for dataset in self._datasets.values())
+        # Последний использованный набор остается, даже если он один больше лимита
+        while total > self.max_bytes and len(self._datasets) > 1:
+            _, evicted = self._datasets.popitem(last=False)
+            total -= evicted.nbytes
+
+
+class DatasetWatcher(threading.Thread):
+    """Фоновый поток, периодически обновляющий наборы данных в кэше"""
+
+    def __init__(self, cache, interval):
+        super().__init__(name='dataset-watcher', daemon=True)
+        self.cache = cache
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.cache.refresh()
+            except Exception:
+                logger.exception('Ошибка при проверке наборов данных')
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,101 @@
+"""Выгрузка предвычисленных таблиц для BI-инструментов.
+
+Таблицы (агрегаты по сегментам, результаты t-тестов, распределения баллов)
+строятся один раз вместе с остальными результатами набора; здесь они только
+сериализуются целыми столбцами и отдаются частями: Arrow IPC (поток),
+Parquet (по группе строк на часть) или CSV.
+"""
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow нужен только для форматов arrow и parquet
+    pa = None
+    pq = None
+
+# Количество строк в одной части ответа
+CHUNK_ROWS = 10000
+
+# Формат: (MIME-тип, расширение файла)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def format_available(fmt):
+    """Можно ли выгрузить таблицу в формате fmt в этом окружении"""
+    return fmt == 'csv' or (fmt in EXPORT_FORMATS and pa is not None)
+
+
+def stream_table(table, fmt, chunk_rows=CHUNK_ROWS):
+    """Генератор байтов таблицы в формате fmt, по chunk_rows строк за часть"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат выгрузки: {fmt}')
+    if not format_available(fmt):
+        raise RuntimeError(f'Для формата {fmt} нужен пакет pyarrow')
+    if fmt == 'csv':
+        return _stream_csv(table, chunk_rows)
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    if fmt == 'arrow':
+        return _stream_arrow(arrow_table, chunk_rows)
+    return _stream_parquet(arrow_table, chunk_rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл только для записи, содержимое которого забирается частями.
+
+    Позиция записи не сбрасывается при выдаче части: по ней писатель Parquet
+    считает смещения групп строк в метаданных.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        """Записанное с прошлого вызова"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_csv(table, chunk_rows):
+    # Заголовок пишется только в первой части
+    yield table.iloc[:chunk_rows].to_csv(index=False).encode('utf-8')
+    for start in range(chunk_rows, len(table), chunk_rows):
+        yield table.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode('utf-8')
+
+
+def _stream_arrow(arrow_table, chunk_rows):
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        for batch in arrow_table.to_batches(max_chunksize=chunk_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    # Маркер конца потока
+    yield sink.drain()
+
+
+def _stream_parquet(arrow_table, chunk_rows):
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, arrow_table.schema) as writer:
+        for start in range(0, max(arrow_table.num_rows, 1), chunk_rows):
+            writer.write_table(arrow_table.slice(start, chunk_rows), row_group_size=chunk_rows)
+            yield sink.drain()
+    # Метаданные файла пишутся в конце
+    yield sink.drain()
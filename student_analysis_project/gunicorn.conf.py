@@ -0,0 +1,67 @@
+"""Запуск нескольких воркеров с общими данными:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Отдельный процесс-загрузчик (shared_store.py --watch) публикует подготовленные
+столбцы в STUDENTS_SHARED_DIR (по умолчанию /dev/shm/student_analysis-<uid>,
+закрытый каталог с правами 0700), воркеры отображают их только для чтения.
+При изменении CSV загрузчик публикует новую версию, и воркеры атомарно
+переключаются на нее. Мастер не загружает данные и не импортирует pandas, в
+нем нет фоновых потоков: воркеры порождаются fork-ом, и поток, застигнутый
+посреди работы, оставил бы в них захваченные блокировки.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+os.environ.setdefault('STUDENTS_SHARED_DIR', f'/dev/shm/student_analysis-{os.getuid()}')
+
+bind = os.environ.get('STUDENTS_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('STUDENTS_WORKERS', multiprocessing.cpu_count()))
+
+SHARED_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shared_store.py')
+loader = None
+
+
+def on_starting(server):
+    """Запуск загрузчика и ожидание первой публикации до запуска воркеров"""
+    global loader
+    # Те же переменные окружения и значения по умолчанию, что и в app.py
+    reload_interval = os.environ.get('STUDENTS_RELOAD_INTERVAL', '5')
+    # По умолчанию публикуется только основной набор; остальные - через
+    # STUDENTS_SHARED_DATASETS="id1,id2" или вручную: python shared_store.py
+    names = os.environ.get('STUDENTS_SHARED_DATASETS',
+                           os.environ.get('STUDENTS_DEFAULT_DATASET', 'StudentsPerformance'))
+    loader = subprocess.Popen(
+        [sys.executable, SHARED_STORE, '--watch', reload_interval, os.environ['STUDENTS_SHARED_DIR'],
+         *filter(None, names.split(','))],
+        stdout=subprocess.PIPE, text=True
+    )
+
+    # Загрузчик закрывает stdout после первой публикации
+    for line in loader.stdout:
+        server.log.debug('Опубликован набор %s', line.strip())
+    loader.stdout.close()
+    try:
+        failed = loader.wait(timeout=1) != 0
+    except subprocess.TimeoutExpired:
+        # Загрузчик работает дальше и следит за файлами
+        failed = False
+    if failed:
+        raise RuntimeError('Не удалось опубликовать наборы в общей памяти')
+
+
+def on_exit(server):
+    """Остановка загрузчика вместе с мастером"""
+    if loader is not None and loader.poll() is None:
+        loader.terminate()
+        loader.wait()
+
+
+def post_worker_init(worker):
+    """Воркер отображает основной набор сразу при старте и следит за обновлениями"""
+    from app import DEFAULT_DATASET, datasets, start_watcher
+
+    datasets.get(DEFAULT_DATASET)
+    start_watcher()
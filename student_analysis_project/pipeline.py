@@ -0,0 +1,289 @@
+import logging
+import os
+import re
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Общие константы анализа
+SCORE_COLUMNS = ['math score', 'reading score', 'writing score']
+HIGHER_EDUCATION = ["bachelor's degree", "master's degree"]
+TARGET_SCORE = 60
+
+# Допустимые значения для проверки строк при загрузке
+SCORE_RANGE = (0, 100)
+CATEGORY_VALUES = {
+    'gender': ['female', 'male'],
+    'race/ethnicity': ['group A', 'group B', 'group C', 'group D', 'group E'],
+    'parental level of education': [
+        "some high school", "high school", "some college",
+        "associate's degree", "bachelor's degree", "master's degree"
+    ],
+    'lunch': ['standard', 'free/reduced'],
+    'test preparation course': ['none', 'completed'],
+}
+
+# Сообщение парсера pandas о пропущенной строке с неверным числом полей
+BAD_LINE_PATTERN = re.compile(r'Skipping line (\d+): (.*)')
+
+
+class RowSelection:
+    """Ленивое представление подмножества строк базового DataFrame.
+
+    Хранит только булеву маску над базовой таблицей; массив индексов строится
+    при первом обращении, а столбцы копируются лишь тогда, когда их запрашивают.
+    """
+
+    def __init__(self, frame, mask):
+        self.frame = frame
+        self.mask = mask
+        self._index = None
+
+    @property
+    def index(self):
+        """Позиции выбранных строк в базовой таблице"""
+        if self._index is None:
+            self._index = np.flatnonzero(self.mask)
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, columns):
+        """Выбранные строки одного столбца (Series) или списка столбцов (DataFrame)"""
+        return self.frame[columns].iloc[self.index]
+
+    def where(self, mask):
+        """Подвыборка: строки этой выборки, удовлетворяющие дополнительной маске"""
+        return RowSelection(self.frame, self.mask & np.asarray(mask, dtype=bool))
+
+    def count(self, mask):
+        """Количество строк выборки, удовлетворяющих маске над базовой таблицей"""
+        return int(np.count_nonzero(self.mask & np.asarray(mask, dtype=bool)))
+
+
+class PreparedData:
+    """Базовая таблица и выборки для проверки гипотезы"""
+
+    def __init__(self, df, validation=None):
+        self.df = df
+        self.validation = validation
+
+        # Очистка данных: удаляем крайние значения (0 и 100 баллов)
+        clean_mask = np.ones(len(df), dtype=bool)
+        for col in SCORE_COLUMNS:
+            scores = df[col].to_numpy()
+            clean_mask &= (scores > 0) & (scores < 100)
+
+        self.all_rows = RowSelection(df, np.ones(len(df), dtype=bool))
+        self.cleaned = RowSelection(df, clean_mask)
+        self.non_higher_ed = self.cleaned.where(~df['has_higher_edu_parents'].to_numpy())
+        self.with_courses = self.non_higher_ed.where(df['took_prep_course'].to_numpy())
+        self.without_courses = self.non_higher_ed.where(~df['took_prep_course'].to_numpy())
+
+
+def add_derived_columns(df):
+    """Добавление производных столбцов в базовую таблицу (без копирования)"""
+    df['total_score'] = df['math score'] + df['reading score'] + df['writing score']
+    df['average_score'] = df['total_score'] / 3
+    df['target_group'] = df['average_score'] >= TARGET_SCORE
+    df['has_higher_edu_parents'] = df['parental level of education'].isin(HIGHER_EDUCATION)
+    df['took_prep_course'] = df['test preparation course'] == 'completed'
+    return df
+
+
+class ValidationReport:
+    """Итоги проверки строк: сколько отклонено, по каким причинам и как быстро"""
+
+    def __init__(self, rows, rejected, reasons, seconds):
+        self.rows = rows
+        self.rejected = rejected
+        self.reasons = reasons
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    def summary(self):
+        return {
+            'rows': self.rows,
+            'accepted': self.rows - self.rejected,
+            'rejected': self.rejected,
+            'reasons': dict(self.reasons),
+            'seconds': round(self.seconds, 4),
+            'rows_per_second': round(self.rows_per_second)
+        }
+
+
+def record_lines(path):
+    """Физическая строка файла, с которой начинается каждая запись CSV, и признак пустой записи.
+
+    Перевод строки внутри поля в кавычках не завершает запись: четность числа
+    кавычек перед каждым переводом строки считается одним проходом по байтам файла.
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    newlines = np.flatnonzero(data == ord('\n'))
+    in_quotes = np.logical_xor.accumulate(data == ord('"'))[newlines]
+    # Порядковые номера переводов строки, которые завершают записи
+    ends = np.flatnonzero(~in_quotes)
+
+    starts = np.concatenate(([0], newlines[ends] + 1))
+    stops = np.concatenate((newlines[ends], [len(data)]))
+    lines = np.concatenate(([1], ends + 2))
+    if starts[-1] == len(data):
+        # После завершающего перевода строки записи нет
+        starts, stops, lines = starts[:-1], stops[:-1], lines[:-1]
+
+    length = stops - starts
+    first = data[np.minimum(starts, max(len(data) - 1, 0))] if len(data) else np.zeros(0, dtype=np.uint8)
+    blank = (length == 0) | ((length == 1) & (first == ord('\r')))
+    return lines, blank
+
+
+def read_csv_checked(path):
+    """Чтение CSV; строки с неверным числом полей не ломают разбор, а возвращаются отдельно.
+
+    Возвращает таблицу, номер строки файла для каждой ее строки и список
+    (номер строки, сообщение) пропущенных парсером строк. Пустые строки в
+    таблицу не попадают, но учитываются в нумерации.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', pd.errors.ParserWarning)
+        df = pd.read_csv(path, on_bad_lines='warn', skip_blank_lines=False)
+
+    # pandas нумерует записи (заголовок - запись 1), а не строки файла
+    skipped = []
+    for warning in caught:
+        if issubclass(warning.category, pd.errors.ParserWarning):
+            skipped.extend(
+                (int(record), message) for record, message in BAD_LINE_PATTERN.findall(str(warning.message))
+            )
+
+    lines, blank = record_lines(path)
+    records = np.setdiff1d(np.arange(1, len(lines)), [record - 1 for record, _ in skipped])
+    if len(records) == len(df):
+        row_lines = lines[records]
+        blank_rows = blank[records]
+    else:
+        # Разбор не совпал с разметкой записей (например, необычный диалект CSV):
+        # строки нумеруются по порядку, пустыми считаются строки без единого значения
+        logger.warning('%s: номера строк в отклоненных записях приблизительные', path)
+        row_lines = np.arange(2, 2 + len(df))
+        blank_rows = df.isna().all(axis=1).to_numpy()
+        lines = np.arange(1, len(df) + len(skipped) + 2)
+
+    if blank_rows.any():
+        df = df[~blank_rows].reset_index(drop=True)
+        row_lines = row_lines[~blank_rows]
+    bad_lines = [(int(lines[min(record, len(lines)) - 1]), message) for record, message in skipped]
+    return df, row_lines, bad_lines
+
+
+def validate_rows(df, bad_lines=(), lines=None):
+    """Векторная проверка строк: диапазон баллов, словари категорий и пропуски.
+
+    Каждое правило - одна операция над массивом столбца. lines - номера строк
+    файла для строк таблицы (по умолчанию строки идут подряд после заголовка).
+    Возвращает таблицу принятых строк (баллы приведены к числам), таблицу
+    отклоненных строк с номером строки в файле и причинами и ValidationReport.
+    """
+    start = time.perf_counter()
+    missing_columns = [col for col in SCORE_COLUMNS + list(CATEGORY_VALUES) if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"В файле нет столбцов: {', '.join(missing_columns)}")
+
+    rows = len(df)
+    rejected = np.zeros(rows, dtype=bool)
+    reasons = np.full(rows, '', dtype=object)
+    counts = {}
+
+    def reject(mask, reason):
+        mask = np.asarray(mask, dtype=bool)
+        count = int(np.count_nonzero(mask))
+        if count:
+            rejected[mask] = True
+            reasons[mask] += reason + '; '
+            counts[reason] = count
+
+    scores = {}
+    for col in SCORE_COLUMNS:
+        missing = df[col].isna().to_numpy()
+        values = pd.to_numeric(df[col], errors='coerce')
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        reject(missing, f'missing {col}')
+        reject(np.isnan(numbers) & ~missing, f'non-numeric {col}')
+        reject((numbers < SCORE_RANGE[0]) | (numbers > SCORE_RANGE[1]), f'{col} out of range')
+        scores[col] = values
+
+    for col, allowed in CATEGORY_VALUES.items():
+        missing = df[col].isna().to_numpy()
+        reject(missing, f'missing {col}')
+        reject(~df[col].isin(allowed).to_numpy() & ~missing, f'unknown {col}')
+
+    if lines is None:
+        lines = np.arange(2, 2 + rows)
+    lines = np.asarray(lines)
+    skipped = np.array([line for line, _ in bad_lines], dtype=np.int64)
+
+    rejects = df[rejected].copy()
+    rejects.insert(0, 'line', lines[rejected])
+    rejects['reason'] = [reason[:-2] for reason in reasons[rejected]]
+    if bad_lines:
+        malformed = pd.DataFrame({
+            'line': skipped,
+            'reason': [f'malformed line: {message}' for _, message in bad_lines]
+        })
+        rejects = pd.concat([rejects, malformed], ignore_index=True).sort_values('line', kind='stable')
+        counts['malformed line'] = len(bad_lines)
+
+    # Без отклоненных строк таблица не копируется
+    valid = df if not rejected.any() else df[~rejected].reset_index(drop=True)
+    for col, values in scores.items():
+        if pd.api.types.is_integer_dtype(valid[col].dtype):
+            continue
+        # Столбец с текстом или пропусками: берем числа, целые - как int64
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)[~rejected]
+        if np.all(numbers == np.floor(numbers)):
+            numbers = numbers.astype(np.int64)
+        valid[col] = numbers
+
+    report = ValidationReport(rows + len(bad_lines), len(rejects), counts, time.perf_counter() - start)
+    return valid, rejects, report
+
+
+def write_rejects(rejects, path):
+    """Атомарная запись отклоненных строк: загрузчик и воркер могут писать один файл одновременно"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            rejects.to_csv(f, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_prepared_data(path, rejects_path=None):
+    """Загрузка CSV с проверкой строк и построение выборок поверх единственной таблицы.
+
+    Отклоненные строки с причинами пишутся в rejects_path (если задан). Файл
+    перезаписывается при каждой загрузке, без отклоненных строк - только заголовок.
+    """
+    df, lines, bad_lines = read_csv_checked(path)
+    df, rejects, report = validate_rows(df, bad_lines, lines)
+    if rejects_path is not None:
+        write_rejects(rejects, rejects_path)
+
+    logger.info('%s: проверено %d строк, отклонено %d, %.0f строк/с',
+                path, report.rows, report.rejected, report.rows_per_second)
+
+    add_derived_columns(df)
+    return PreparedData(df, report)
@@ -0,0 +1,220 @@
+"""Подготовленные столбцы наборов данных в общей памяти.
+
+Процесс-загрузчик один раз разбирает CSV и сохраняет столбцы (баллы, коды
+категорий, производные средние) в .npy-файлы каталога в /dev/shm или на диске;
+рабочие процессы отображают их в память только для чтения, поэтому страницы
+данных общие для всех воркеров. Предвычисленные результаты хранятся в JSON, а
+их таблицы - теми же .npy-столбцами: при чтении не исполняется никакой код.
+Каталог должен принадлежать текущему пользователю и быть закрыт для остальных.
+
+Запуск загрузчика вручную (с --watch он остается работать и перепубликует
+наборы, исходные файлы которых изменились):
+    python shared_store.py /dev/shm/student_analysis-$(id -u) [dataset_id ...]
+    python shared_store.py --watch 5 /dev/shm/student_analysis-$(id -u) StudentsPerformance
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import stat
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from pipeline import PreparedData, load_prepared_data
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+RESULTS_FILE = 'results.json'
+
+# Версии, опубликованные этим процессом: каталог набора -> версия
+_published = {}
+
+
+def private_dir(path):
+    """Создание каталога с правами 0700 и проверка, что он принадлежит только нам"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f'Каталог {path} не принадлежит текущему пользователю')
+    if info.st_mode & 0o077:
+        raise PermissionError(f'Каталог {path} доступен другим пользователям (нужны права 0700)')
+    return path
+
+
+def source_version(path):
+    """Версия исходного CSV: меняется при любой перезаписи файла"""
+    info = os.stat(path)
+    return f'{info.st_mtime_ns}-{info.st_size}'
+
+
+def write_columns(frame, directory, prefix=''):
+    """Запись столбцов таблицы в .npy-файлы (текст - кодами); описание столбцов для meta.json"""
+    columns = []
+    for number, name in enumerate(frame.columns):
+        series = frame[name]
+        file_name = f'{prefix}{number}.npy'
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(directory, file_name), series.to_numpy())
+            columns.append({'name': name, 'file': file_name})
+        else:
+            codes, categories = pd.factorize(series, sort=True)
+            dtype = np.int8 if len(categories) < 128 else np.int32
+            np.save(os.path.join(directory, file_name), codes.astype(dtype))
+            columns.append({'name': name, 'file': file_name, 'categories': categories.tolist()})
+    return columns
+
+
+def read_columns(directory, columns, mmap=True):
+    """Таблица из .npy-файлов: с mmap - отображение с категориями, без - копия со строками"""
+    data = {}
+    for column in columns:
+        values = np.load(os.path.join(directory, column['file']), mmap_mode='r' if mmap else None)
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, column['categories'])
+            if not mmap:
+                values = pd.Series(values).astype('str')
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _json_default(value):
+    """Скаляры numpy в результатах записываются как обычные числа"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Значение типа {type(value).__name__} не записывается в JSON')
+
+
+def export_prepared(prepared, directory, results=None):
+    """Запись столбцов подготовленной таблицы и предвычисленных результатов в каталог"""
+    meta = {'rows': len(prepared.df), 'columns': write_columns(prepared.df, directory)}
+
+    if results is not None:
+        # Словари таблиц (например, export) пишутся столбцами, остальное - в JSON
+        plain = {}
+        tables = {}
+        for key, value in results.items():
+            if isinstance(value, dict) and value and all(isinstance(t, pd.DataFrame) for t in value.values()):
+                tables[key] = {
+                    name: write_columns(table, directory, f'{key}-{name}-')
+                    for name, table in value.items()
+                }
+            else:
+                plain[key] = value
+        with open(os.path.join(directory, RESULTS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(plain, f, ensure_ascii=False, default=_json_default)
+        meta['tables'] = tables
+
+    # meta.json пишется последним: его наличие означает, что каталог готов
+    with open(os.path.join(directory, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def export_dataset(source_path, shared_dir, dataset_id, build=None, rejects_path=None):
+    """Подготовка CSV и публикация его столбцов в общем каталоге.
+
+    Каждая версия пишется во временный каталог и атомарно переименовывается,
+    поэтому уже отображенные воркерами файлы никогда не перезаписываются.
+    Пропускается только версия, которую опубликовал этот же процесс: каталоги,
+    оставшиеся от других запусков, не считаются готовыми и пишутся заново.
+    """
+    private_dir(shared_dir)
+    version = source_version(source_path)
+    dataset_dir = os.path.join(shared_dir, dataset_id)
+    target = os.path.join(dataset_dir, version)
+    if _published.get(dataset_dir) == version and os.path.isfile(os.path.join(target, META_FILE)):
+        return target
+
+    os.makedirs(dataset_dir, mode=0o700, exist_ok=True)
+    tmp = os.path.join(dataset_dir, f'.tmp-{version}-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    prepared = load_prepared_data(source_path, rejects_path)
+    export_prepared(prepared, tmp, build(prepared) if build is not None else None)
+    shutil.rmtree(target, ignore_errors=True)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Ту же версию одновременно опубликовал другой загрузчик
+        shutil.rmtree(tmp, ignore_errors=True)
+    _published[dataset_dir] = version
+
+    # Старые версии удаляем: у воркеров, которые их отобразили, файлы остаются доступны
+    for name in os.listdir(dataset_dir):
+        if name != version and not name.startswith('.'):
+            shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+    return target
+
+
+def open_shared(shared_dir, dataset_id, source_path):
+    """Отображение опубликованной версии набора: (PreparedData, results) или None"""
+    directory = os.path.join(private_dir(shared_dir), dataset_id, source_version(source_path))
+    try:
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        df = read_columns(directory, meta['columns'])
+
+        results = None
+        results_path = os.path.join(directory, RESULTS_FILE)
+        if os.path.isfile(results_path):
+            with open(results_path, encoding='utf-8') as f:
+                results = json.load(f)
+            for key, tables in meta.get('tables', {}).items():
+                results[key] = {
+                    name: read_columns(directory, columns, mmap=False)
+                    for name, columns in tables.items()
+                }
+    except FileNotFoundError:
+        # Версия еще не опубликована или загрузчик как раз заменяет каталог
+        return None
+    return PreparedData(df), results
+
+
+def publish(shared_dir, dataset_ids):
+    """Публикация наборов из каталога данных приложения; пары (идентификатор, каталог)"""
+    from app import build_results, datasets
+
+    published = []
+    for dataset_id in dataset_ids or datasets.available():
+        path = datasets.path_for(dataset_id)
+        if path is None:
+            logger.warning('Набор данных не найден: %s', dataset_id)
+            continue
+        target = export_dataset(path, shared_dir, dataset_id, build_results, datasets.rejects_path_for(dataset_id))
+        published.append((dataset_id, target))
+    return published
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('shared_dir')
+    parser.add_argument('dataset_ids', nargs='*', help='по умолчанию - все наборы каталога данных')
+    parser.add_argument('--watch', type=float, default=0, metavar='СЕКУНДЫ',
+                        help='после публикации проверять файлы с этим периодом')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [loader] %(message)s')
+
+    for dataset_id, target in publish(args.shared_dir, args.dataset_ids):
+        print(f'{dataset_id}: {target}', flush=True)
+    if args.watch <= 0:
+        return
+
+    # Первая публикация завершена: запустивший процесс получает конец stdout,
+    # дальнейший вывод идет в stderr
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    parent = os.getppid()
+    while os.getppid() == parent:
+        time.sleep(args.watch)
+        try:
+            publish(args.shared_dir, args.dataset_ids)
+        except Exception:
+            logger.exception('Не удалось обновить наборы в общей памяти')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import read_csv_checked, validate_rows
+
+HEADER = ('gender,race/ethnicity,parental level of education,lunch,'
+          'test preparation course,math score,reading score,writing score')
+
+
+def test_rejects_report_file_line_numbers(tmp_path):
+    path = tmp_path / 'students.csv'
+    path.write_text('\n'.join([
+        HEADER,                                                              # 1
+        'female,group B,high school,standard,none,72,72,74',                 # 2
+        'male,group C,some college,standard,completed,69,90,88',             # 3
+        '',                                                                  # 4
+        'female,group A,high school,standard,none,abc,72,74',                # 5
+        'male,group C,"some college",standard,none,47,57,44,extra',          # 6
+        'male,group Z,high school,free/reduced,none,76,78,75',               # 7
+        '',                                                                  # 8
+        'female,group D,high school,standard,none,64,64,150',                # 9
+        'male,"group',                                                       # 10
+        'B",high school,standard,none,40,43,39',                             # 11
+        'female,group E,high school,standard,none,52,58,60',                 # 12
+    ]) + '\n', encoding='utf-8')
+
+    df, lines, bad_lines = read_csv_checked(path)
+    valid, rejects, report = validate_rows(df, bad_lines, lines)
+
+    assert list(zip(rejects['line'], rejects['reason'])) == [
+        (5, 'non-numeric math score'),
+        (6, 'malformed line: expected 8 fields, saw 9'),
+        (7, 'unknown race/ethnicity'),
+        (9, 'writing score out of range'),
+        (10, 'unknown race/ethnicity'),
+    ]
+    assert len(valid) == 3
+    assert str(valid['math score'].dtype) == 'int64'
+    assert report.rows == 8
+    assert report.rejected == 5